@@ -1,35 +1,37 @@
 import numpy as np
-import time
 
 
 class TexasHoldemAI:
 
     name = 'default'
     table_card_names = {0: 'pre-flop', 3: 'flop', 4: 'turn', 5: 'river'}
+    max_data = 100  # hands kept in data; the game's history, if it has one, keeps the rest
 
-    def __init__(self, name, cash, players):
-        np.random.seed(int(int(1e5 * time.time()) % 1e5))
+    def __init__(self, name, cash, players, rng=None):
+        self.rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
         self.name = name
         self.players = players
         self.cashes = {player: cash for player in players}
         self.deal = self.pot = self.table_cards = None
-        self.bluff_likelihood = np.random.random()
-        self.big_bet_likelihood = np.random.random()
+        self.bluff_likelihood = self.rng.random()
+        self.big_bet_likelihood = self.rng.random()
         self.check_threshold = 0.5
         self.big_bet = False
         self.bluffing = False
         self.current_bets = {}
         self.data = {}
+        self.history = None  # set by the game to its TexasHoldemHistory.HandHistory, if it records one
         self.hands = 0
 
     def reset(self):
-        self.bluffing = np.random.random() < self.bluff_likelihood
-        self.big_bet = np.random.random < self.big_bet_likelihood
+        self.bluffing = self.rng.random() < self.bluff_likelihood
+        self.big_bet = self.rng.random() < self.big_bet_likelihood
 
     def new_game(self, deal):
         self.deal = deal
         self.pot = 0
         self.table_cards = tuple()
+        self.data.pop(self.hands - self.max_data, None)
         self.data[self.hands] = {'deal': self.deal}
         for player in self.players:
             self.data[self.hands][player] = {}
@@ -43,13 +45,13 @@ class TexasHoldemAI:
         go_for_it = w > (self.check_threshold + this_bet/max([1, self.cashes[self.name]]))
         if go_for_it or self.bluffing or big_stack:
             if self.big_bet:
-                amount = int(max([this_bet, cash / np.random.randint(2, 7)]))
+                amount = int(max([this_bet, cash / self.rng.integers(2, 7)]))
             elif self.bluffing:
-                amount = int(max([this_bet, cash / np.random.randint(4, 8)]))
+                amount = int(max([this_bet, cash / self.rng.integers(4, 8)]))
             elif big_stack:
-                amount = int(max([this_bet, cash / np.random.randint(15, 25)]))
+                amount = int(max([this_bet, cash / self.rng.integers(15, 25)]))
             else:
-                amount = int(max([this_bet, cash / np.random.randint(15, 25)]))
+                amount = int(max([this_bet, cash / self.rng.integers(15, 25)]))
             self.pot += amount
             self.cashes[self.name] -= amount
             self.data[self.hands][self.name][self.table_card_names[len(self.table_cards)]] = amount
@@ -70,7 +72,7 @@ class TexasHoldemAI:
             self.data[self.hands][loser]['deal'] = deal
             self.data[self.hands]['losers'].append(loser)
         self.data[self.hands]['pot'] = info['pot']
-        self.data[self.hands]['folded'] = info['folded']
+        self.data[self.hands]['folded'] = [player.name for player in info['folded']]
         self.hands += 1
 
     def update_turn(self, name, response):  # store info about other players for learning
@@ -90,3 +92,39 @@ class TexasHoldemAI:
         self.data[self.hands][self.table_card_names[len(table_cards)]] = \
             table_cards if len(table_cards) == 3 else table_cards[-1]
         self.current_bets = {}
+
+
+class BatchTexasHoldemAI:  # TexasHoldemAI's thresholds for every seat of a TexasHoldemTables.Tables at once
+
+    name = 'default'
+
+    def __init__(self, n_tables, n_seats, rng=None):
+        self.rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+        shape = (n_tables, n_seats)
+        self.bluff_likelihood = self.rng.random(shape)
+        self.big_bet_likelihood = self.rng.random(shape)
+        self.check_threshold = 0.5
+        self.big_bet = np.zeros(shape, dtype=bool)
+        self.bluffing = np.zeros(shape, dtype=bool)
+
+    def reset(self, rows=None):  # rows (tables) to draw bluffing and big_bet for again, all if None
+        rows = slice(None) if rows is None else rows
+        self.bluffing[rows] = self.rng.random(self.bluffing[rows].shape) < self.bluff_likelihood[rows]
+        self.big_bet[rows] = self.rng.random(self.big_bet[rows].shape) < self.big_bet_likelihood[rows]
+
+    def make_decisions(self, tables, rows, seats, predicted):
+        # responses (0 fold, 1 call, 2 bet, as in TexasHoldemTables.responses) and bet amounts of the seats up at
+        # tables rows, from their (n, 3) predicted [win, loss, draw]; make_decision's this_bet is the amount to call
+        w, l = predicted[:, 0], predicted[:, 1]
+        cash = tables.cash[rows, seats]
+        this_bet = tables.current_bet[rows] - tables.bet[rows, seats]
+        others = tables.cash[rows].copy()
+        others[np.arange(len(rows)), seats] = -1
+        big_stack = cash > others.max(axis=1) * 2
+        go_for_it = w > (self.check_threshold + this_bet / np.maximum(1, cash))
+        bluffing, big_bet = self.bluffing[rows, seats], self.big_bet[rows, seats]
+        n = len(rows)
+        divisors = np.where(big_bet, self.rng.integers(2, 7, n),
+                            np.where(bluffing, self.rng.integers(4, 8, n), self.rng.integers(15, 25, n)))
+        amounts = np.maximum(this_bet, cash / divisors).astype(np.int64)
+        return np.where(go_for_it | bluffing | big_stack, 2, np.where(l > 0.9, 0, 1)), amounts
@@ -1,6 +1,16 @@
+import copy
+import cProfile
+import json
 import numpy as np
+import os
 import time
-from itertools import combinations
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import combinations, permutations
+from math import comb
+
+table_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
 
 
 class Suit:
@@ -49,12 +59,29 @@ class Name:
         return hash(self.__repr__())
 
 
-class Card:
+class Card:  # 52 interned instances; id = 4 * (number - 2) + alphabetical suit index
+
+    deck = ()  # indexed by id, filled in at the end of the module
+
+    def __new__(cls, name, suit):
+        return cls.deck[card_id(name, suit)]
+
+    @classmethod
+    def from_id(cls, i):
+        return cls.deck[i]
 
-    def __init__(self, name, suit):
-        self.name = Name(name)
-        self.suit = Suit(suit)
-        self.display = None
+    @classmethod
+    def _make(cls, i):
+        card = object.__new__(cls)
+        card.id = i
+        card.bit = 1 << i
+        card.name = Name(Deck.names[i // 4])
+        card.suit = Suit(suit_order[i % 4])
+        card.display = None
+        return card
+
+    def __reduce__(self):
+        return Card.from_id, (self.id,)
 
     def __repr__(self):
         return '%s of %s' % (self.name, self.suit)
@@ -63,38 +90,28 @@ class Card:
         return self.__repr__()
 
     def __eq__(self, other):
-        return self.name == other.name and self.suit == other.suit
+        return isinstance(other, Card) and self.id == other.id
 
     def __lt__(self, other):
-        if self.name == other.name:
-            return self.suit < other.suit
-        else:
-            return self.name < other.name
+        return self.id < other.id
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return self.id
 
 
-class Hand:
+class Hand:  # five cards and their evaluator rank, which orders hands
 
+    __slots__ = ('cards', 'mask', 'score')
     number_dict = {14: 'Ace', 13: 'King', 12: 'Queen', 11: 'Jack'}
+    categories = ['High card', 'Pair', 'Two pair', 'Three of a kind', 'Straight', 'Flush', 'Full house',
+                  'Four of a kind', 'Straight flush']
 
     def __init__(self, cards):
         if len(cards) != Deck.hand_n:
             raise ValueError('Wrong number of cards')
         self.cards = sorted(cards)[::-1]
-        self.suits = {}
-        self.numbers = {}
-        for card in cards:
-            if card.suit.name in self.suits:
-                self.suits[card.suit.name] += 1
-            else:
-                self.suits[card.suit.name] = 1
-            if card.name.number in self.numbers:
-                self.numbers[card.name.number] += 1
-            else:
-                self.numbers[card.name.number] = 1
-        self.score = self._score()
+        self.mask = cards_to_mask(cards)
+        self.score = get_evaluator().rank([card.id for card in cards])
 
     def __repr__(self):
         return (', '.join([card.__repr__()
@@ -104,98 +121,70 @@ class Hand:
         return self.__repr__()
 
     def __eq__(self, other):
-        return all([this_card == other_card for this_card, other_card in
-                    zip(self.cards, other.cards)])
+        return isinstance(other, Hand) and self.mask == other.mask
 
     def __lt__(self, other):
-        for s0, s1 in zip(self.score[::-1], other.score[::-1]):
-            if s0 == s1:
-                continue
-            else:
-                return s0 < s1
-        return False
+        return self.score < other.score
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return self.mask
+
+    def category(self):
+        return self.score >> (4 * Deck.hand_n)
 
-    def _score(self):
-        return (self.high_card(), self.pair(), self.two_pair(), self.three(), self.straight(), self.flush(),
-                self.full_house(), self.four(), self.straight() * self.flush())
+    def numbers(self):  # the numbers that rank the hand, most significant first
+        return unpack_rank(self.score)[1]
 
     def flush(self):
-        return (max(self.numbers.keys()) if
-                max(self.suits.values()) == Deck.hand_n else 0)
+        return self.numbers()[0] if self.category() in (5, 8) else 0
 
     def straight(self):
-        return (self.cards[0].name.number if
-                all([self.cards[i].name.number - 1 == self.cards[i + 1].name.number
-                     for i in range(Deck.hand_n - 1)]) else 0)
+        return self.numbers()[0] if self.category() in (4, 8) else 0
 
     def four(self):
-        return (max(self.numbers, key=self.numbers.get)
-                if max(self.numbers.values()) == 4 else 0)
+        return self.numbers()[0] if self.category() == 7 else 0
 
     def full_house(self):
-        return (Deck.n_names * max(self.numbers, key=self.numbers.get) +
-                min(self.numbers, key=self.numbers.get)
-                if max(self.numbers.values()) == 3 and min(self.numbers.values()) == 2 else 0)
+        return Deck.n_names * self.numbers()[0] + self.numbers()[1] if self.category() == 6 else 0
 
     def three(self):
-        return max(self.numbers, key=self.numbers.get) if max(self.numbers.values()) == 3 else 0
+        return self.numbers()[0] if self.category() in (3, 6) else 0
 
     def two_pair(self):
-        one_pair = 0
-        for k, v in self.numbers.items():
-            if v == 2:
-                if one_pair > 0:
-                    if one_pair > k:
-                        return Deck.n_names * one_pair + k
-                    else:
-                        return Deck.n_names * k + one_pair
-                else:
-                    one_pair = k
-        return 0
+        return Deck.n_names * self.numbers()[0] + self.numbers()[1] if self.category() == 2 else 0
 
     def pair(self):
-        for k, v in self.numbers.items():
-            if v == 2:
-                return k
-        return 0
+        category = self.category()
+        return self.numbers()[0] if category in (1, 2) else self.numbers()[1] if category == 6 else 0
 
     def high_card(self):
         return sum([(Deck.n_names ** (Deck.hand_n - i)) * card.name.number for
                     i, card in enumerate(self.cards)])
 
     def number_to_name(self, number):
-        if number <= Deck.n_names + 1:
-            return self.number_dict[number] if number in self.number_dict else number
-        else:
-            name0 = self.number_to_name(number // Deck.n_names)
-            name1 = self.number_to_name(number % Deck.n_names)
-            return name0, name1
+        return self.number_dict[number] if number in self.number_dict else number
 
     def get_text(self):
-        straight, flush, four, three, pair = self.straight(), self.flush(), self.four(), self.three(), self.pair()
-        full_house = self.full_house()
-        two_pair = self.two_pair()
-        if straight and flush:
-            return '%s high straight flush' % self.number_to_name(straight)
-        elif four:
-            return 'Four %ss' % self.number_to_name(four)
-        elif full_house:
-            return 'Full house {}s full of {}s'.format(*self.number_to_name(full_house))
-        elif flush:
-            return 'Flush, %s high' % self.number_to_name(flush)
-        elif straight:
-            return 'Straight %s high' % self.number_to_name(straight)
-        elif three:
-            return 'Three %ss' % self.number_to_name(three)
-        elif two_pair:
-            return 'Two pair {}s and {}s'.format(*self.number_to_name(two_pair))
-        elif pair:
-            return 'Pair of %ss' % self.number_to_name(pair)
+        category, numbers = unpack_rank(self.score)
+        names = [self.number_to_name(number) for number in numbers]
+        if category == 8:
+            return '%s high straight flush' % names[0]
+        elif category == 7:
+            return 'Four %ss' % names[0]
+        elif category == 6:
+            return 'Full house {}s full of {}s'.format(*names)
+        elif category == 5:
+            return 'Flush, %s high' % names[0]
+        elif category == 4:
+            return 'Straight %s high' % names[0]
+        elif category == 3:
+            return 'Three %ss' % names[0]
+        elif category == 2:
+            return 'Two pair {}s and {}s'.format(*names[:2])
+        elif category == 1:
+            return 'Pair of %ss' % names[0]
         else:
-            return 'High card %s' % self.number_to_name(max(self.numbers))
+            return 'High card %s' % names[0]
 
 
 class Deck:
@@ -207,53 +196,728 @@ class Deck:
     hand_n = 5
     deal_n = 2
 
-    def __init__(self, mc_delta=0.01):
-        np.random.seed(int(int(1e5 * time.time()) % 1e5))
+    full_mask = (1 << N) - 1
+    min_target_stderr = 0.001  # the smallest score_holdem target_stderr without a time_budget, up to 250000 runouts
+
+    def __init__(self, mc_delta=0.01, mc_batch=1000, exact_budget=10000, preflop_table=None, equity_cache=None,
+                 rng=None, mc_rng=None, mc_jobs=1, mc_executor=None):
+        self.rng = make_rng(rng)  # for dealing
+        self.mc_rng = self.rng if mc_rng is None else make_rng(mc_rng)  # for sampling runouts
         self.mc_delta = mc_delta
-        self.cards = set([Card(name, suit) for suit in self.suits for name in self.names])
+        self.mc_batch = mc_batch  # runouts per convergence check, falsy to sample one at a time
+        self.mc_jobs = mc_jobs  # monte carlo batches sampled and scored at once on mc_executor
+        self.mc_executor = mc_executor  # an executor, or 'threads' (if None) or 'processes' for a shared pool
+        self.exact_budget = exact_budget  # enumerate every runout instead when there are at most this many
+        self.preflop_table = preflop_table  # a PreflopTable, None for the one in table_dir if built, or False
+        self.equity_cache = equity_cache  # an EquityCache, None for the shared equity_cache, or False
+        self.mask = self.full_mask  # bit i is set while Card.deck[i] is in the deck
+        self.order = None  # the deck shuffled once on the first draw, dealt from self.cursor on
+        self.cursor = 0
+
+    @property
+    def cards(self):
+        return set(mask_to_cards(self.mask))
+
+    @cards.setter
+    def cards(self, cards):
+        self.mask = cards_to_mask(cards)
+        self.order = None
+
+    def __len__(self):
+        return self.mask.bit_count()
 
     def random_cards(self, n):
-        n_combos = int(fac(len(self.cards)) / (fac(n) * fac(len(self.cards) - n)))
-        index = np.random.randint(n_combos)
-        for i, v in enumerate(combinations(self.cards, n)):
-            if i == index:
-                self.cards = self.cards.difference(set(v))
-                return v
-        return
-
-    def score_holdem(self, deal, table_cards=None, n_other_players=1, other_deals=None):
-        if table_cards is None:
-            table_cards = tuple()
-
-        def get_mc_delta(old, this):
-            new = np.add(old, this)
-            return new, 1 if not old.sum() else sum(abs(new / new.sum() - old / old.sum()))
-
-        this_cards = self.cards.difference(deal).difference(set(table_cards))
+        if self.order is None:
+            self.order = self.rng.permutation(mask_to_ids(self.mask)).tolist()
+            self.cursor = 0
+        cards = []
+        while len(cards) < n and self.cursor < len(self.order):
+            i = self.order[self.cursor]
+            self.cursor += 1
+            if self.mask >> i & 1:  # skips cards taken out of the mask since the shuffle
+                cards.append(Card.deck[i])
+                self.mask ^= 1 << i
+        if len(cards) < n:
+            raise ValueError('Not enough cards')
+        return tuple(cards)
+
+    def deal_table(self, n_deals, n_table_cards=hand_n):  # n_deals deals and n_table_cards table cards at once
+        cards = self.random_cards(self.deal_n * n_deals + n_table_cards)
+        return ([cards[i:i+self.deal_n] for i in range(0, self.deal_n * n_deals, self.deal_n)],
+                cards[self.deal_n * n_deals:])
+
+    def score_holdem(self, deal, table_cards=None, n_other_players=1, other_deals=None, return_info=False,
+                     target_stderr=None, time_budget=None):
+        # [win, loss, draw] fractions; with a target standard error or a time budget in ms, sampling stops as soon as
+        # every fraction's standard error is within target_stderr or the time is up, whichever comes first
+        if target_stderr is not None and target_stderr <= 0:
+            raise ValueError('target_stderr must be positive')
+        if target_stderr is not None and target_stderr < self.min_target_stderr and time_budget is None:
+            raise ValueError('target_stderr below %g needs a time_budget' % self.min_target_stderr)
+        with stats.section('score_holdem'):
+            if table_cards is None:
+                table_cards = tuple()
+            cache = equity_cache if self.equity_cache is None else self.equity_cache
+            key = None
+            if cache is not False and cache.enabled:
+                known = cards_to_mask(deal) | cards_to_mask(table_cards)
+                for other_deal in [] if other_deals is None else other_deals:
+                    known |= cards_to_mask(other_deal)
+                key = (cache.key(deal, table_cards, other_deals, self.full_mask & ~self.mask & ~known),
+                       n_other_players if other_deals is None else None,
+                       self.mc_delta, self.mc_batch, self.exact_budget, self.preflop_table, target_stderr, time_budget)
+                cached = cache.get(key)
+                if cached is not None:
+                    if stats.enabled:
+                        stats.count('score_holdem cached')
+                    result, info = copy_score(*cached)
+                    return (result, dict(info, cached=True)) if return_info else result
+            counts, method = self.estimate_holdem(deal, table_cards, n_other_players, other_deals, target_stderr,
+                                                  time_budget)
+            result = counts / counts.sum()
+            stderr, ci = confidence(counts) if method != 'exact' else (np.zeros(3), np.vstack([result, result]).T)
+            info = {'method': method, 'n': int(counts.sum()), 'cached': False, 'stderr': stderr, 'ci': ci}
+            if stats.enabled:
+                stats.count('score_holdem ' + method)
+                stats.count('runouts ' + method, info['n'])
+            if key is not None:
+                cache.put(key, copy_score(result, info))
+            return (result, info) if return_info else result
+
+    def unseen_mask(self, deal, table_cards, other_deals=None):  # the deck without any of the known cards
+        mask = self.mask & ~cards_to_mask(deal) & ~cards_to_mask(table_cards)
         for other_deal in [] if other_deals is None else other_deals:
-            this_cards = this_cards.difference(set(other_deal))
+            mask &= ~cards_to_mask(other_deal)
+        return mask
+
+    def tabulate_holdem(self, deal, table_cards, n_other_players=1, other_deals=None):
+        # counts and method from the preflop table or every runout if either is cheap enough, else None
+        if not table_cards and other_deals is None:
+            preflop_table = get_preflop_table() if self.preflop_table is None else self.preflop_table
+            counts = preflop_table.lookup(deal, n_other_players) if preflop_table else None
+            if counts is not None:
+                return counts, 'table'
+        ids = mask_to_ids(self.unseen_mask(deal, table_cards, other_deals))
+        n_deals = 0 if other_deals is not None else n_other_players
+        if count_runouts(len(ids), self.hand_n - len(table_cards), n_deals) <= self.exact_budget:
+            dealt = enumerate_runouts(ids, self.hand_n - len(table_cards), n_deals)
+            return self.score_runouts(deal, table_cards, dealt, n=n_other_players, other_deals=other_deals), 'exact'
+        return None
+
+    def estimate_holdem(self, deal, table_cards, n_other_players=1, other_deals=None, target_stderr=None,
+                        time_budget=None):  # counts and method used
+        counts = self.tabulate_holdem(deal, table_cards, n_other_players, other_deals)
+        if counts is not None:
+            return counts
+        this_cards = mask_to_cards(self.unseen_mask(deal, table_cards, other_deals))
+        if target_stderr is not None or time_budget is not None:
+            return self.mc_anytime(deal, table_cards, this_cards, n_other_players, other_deals, target_stderr,
+                                   time_budget), 'mc'
+        if self.mc_batch:
+            n_other = 0 if other_deals is not None else self.deal_n * n_other_players
+            width = n_other + self.hand_n - len(table_cards)
+            results = {'mc': np.array([0, 0, 0])}  # wins, losses, draws
+            score = outcome_scorer(deal, table_cards, n_other_players, other_deals)
+            self.sample_runouts([card.id for card in this_cards], width, np.zeros((0, width), dtype=int), score,
+                                results)
+            return results['mc'], 'mc'
         mc_delta = 1
-        result = np.array([0, 0, 0])  # wins, losses, draws
+        result = np.array([0, 0, 0])
         while mc_delta > self.mc_delta or (not result.all() and result.sum() < 1/self.mc_delta):
             this_result = self.mc(deal, table_cards, this_cards, n=n_other_players, other_deals=other_deals)
             result, mc_delta = get_mc_delta(result, this_result)
-        return result / result.sum()
+            if stats.enabled:
+                stats.count('mc batches')
+        return result, 'mc'
+
+    def sample_runouts(self, ids, width, fresh, score, results, progress=None):
+        # the monte carlo loop of score_holdem, EquitySession and TableEquity: batches of runouts of width of ids,
+        # the fresh rows first and then new samples, until no count in results moves more than mc_delta in a batch
+        # and each has every outcome or enough runouts; score(dealt) gives the batch's counts by results key and
+        # anything to keep with them, and has to pickle for a process pool, like a partial of a module function;
+        # progress(results) is called after every batch; returns the (dealt, kept) of each batch
+        batches, mc_delta = [], 1
+        these = self.runout_batches(ids, width, fresh, score, self.mc_batch or 1000)
+        for dealt, (counts, kept) in these:
+            batches.append((dealt, kept))
+            mc_delta = 0
+            for key, this_result in counts.items():
+                results[key], this_mc_delta = get_mc_delta(results[key], this_result)
+                mc_delta = max([mc_delta, this_mc_delta])
+            if stats.enabled:
+                stats.count('mc batches')
+            if progress is not None:
+                progress(results)
+            if mc_delta <= self.mc_delta and all([result.all() or result.sum() >= 1/self.mc_delta
+                                                  for result in results.values()]):
+                break
+        these.close()  # cancels any pooled batches not started yet
+        return batches
+
+    def runout_batches(self, ids, width, fresh, score, size):
+        # endless (dealt, score(dealt)) of batches of size runouts of width of ids, the fresh rows first; with
+        # mc_jobs > 1 the rest are sampled and scored mc_jobs batches at a time on the pool, and come in the order
+        # they were submitted so that a seed still gives the same results
+        get_evaluator()  # loaded before any worker needs it
+        while len(fresh):
+            dealt, fresh = fresh[:size], fresh[size:]
+            yield dealt, score(dealt)
+        while self.mc_jobs <= 1:
+            dealt = sample_cards(ids, width, size, self.mc_rng)
+            yield dealt, score(dealt)
+        while True:
+            futures = self.submit_batches(ids, width, [size] * self.mc_jobs, score)
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def submit_batches(self, ids, width, sizes, score):
+        # futures of (dealt, score(dealt)) for a batch of each of sizes runouts on mc_executor, each sampled from its
+        # own child of mc_rng
+        executor = self.mc_executor
+        if executor is None or isinstance(executor, str):
+            executor = get_mc_executor('threads' if executor is None else executor)
+        return [executor.submit(score_sample, ids, width, size, rng, score)
+                for size, rng in zip(sizes, self.mc_rng.spawn(len(sizes)))]
+
+    def mc_anytime(self, deal, table_cards, cards, n=None, other_deals=None, target_stderr=None, time_budget=None):
+        # summed batches until the target standard error or time_budget ms, sizing each batch from the runouts still
+        # needed for target_stderr and the time per runout of the last batch, so the last one ends before the deadline
+        get_evaluator()  # loaded before the clock starts
+        start = time.perf_counter()
+        deadline = None if time_budget is None else start + time_budget / 1000
+        result, size = np.array([0, 0, 0]), 100
+        max_size = (self.mc_batch or 1000) * (1 if deadline is not None else 8) * max([1, self.mc_jobs])
+        width = (0 if other_deals is not None else self.deal_n*n) + self.hand_n - len(table_cards)
+        score = outcome_scorer(deal, table_cards, n, other_deals)
+        while True:
+            batch_start = time.perf_counter()
+            if self.mc_jobs > 1:  # split over the pool
+                sizes = [-(-size // self.mc_jobs)] * self.mc_jobs
+                futures = self.submit_batches([card.id for card in cards], width, sizes, score)
+                size = sum(sizes)
+                result = result + sum([future.result()[1][0]['mc'] for future in futures])
+            else:
+                result = result + self.mc_batched(deal, table_cards, cards, n=n, other_deals=other_deals, size=size)
+            if stats.enabled:
+                stats.count('mc batches')
+            stderr = confidence(result)[0].max()
+            if target_stderr is not None and stderr <= target_stderr:
+                return result
+            if deadline is not None:
+                now = time.perf_counter()
+                size = min([max_size, int(0.8 * (deadline - now) * size / (now - batch_start))])
+                if size < 10:
+                    return result
+            else:
+                size = max_size
+            if target_stderr is not None:  # about what p (1 - p) / n = target_stderr ** 2 needs
+                size = min([size, max([100, int(result.sum() * ((stderr / target_stderr) ** 2 - 1))])])
+
+    def mc_batched(self, deal, table_cards, cards, n=None, other_deals=None, size=1000):  # summed mc over size runouts
+        n_other = 0 if other_deals is not None else self.deal_n*n
+        dealt = sample_cards([card.id for card in cards], n_other + self.hand_n - len(table_cards), size, self.mc_rng)
+        return self.score_runouts(deal, table_cards, dealt, n=n, other_deals=other_deals)
+
+    def score_runouts(self, deal, table_cards, dealt, n=None, other_deals=None):
+        # [win, loss, draw] counts over the rows of dealt: ids of the n other deals (unless other_deals are
+        # given) followed by the rest of the table cards
+        return outcome_counts(self.runout_outcomes(deal, table_cards, dealt, n=n, other_deals=other_deals))
+
+    def runout_outcomes(self, deal, table_cards, dealt, n=None, other_deals=None):  # 1, -1 or 0 per row of dealt
+        return runout_outcomes(card_ids(deal), card_ids(table_cards), dealt, n,
+                               None if other_deals is None else [card_ids(other_deal) for other_deal in other_deals])
 
     def mc(self, deal, table_cards, cards, n=None, other_deals=None):
+        cards = tuple(cards)
+        n_other = 0 if other_deals is not None else self.deal_n*n
+        dealt = [cards[i] for i in self.mc_rng.choice(len(cards), n_other + self.hand_n - len(table_cards),
+                                                      replace=False)]
         if other_deals is None:
-            other_deals = np.random.choice(list(cards), self.deal_n*n)
-            cards = cards.difference(other_deals)
-            other_deals = [tuple(other_deals[i:i+2]) for i in 2*np.arange(n)]
-        next_table_cards = tuple(np.random.choice(list(cards), self.hand_n - len(table_cards)))
-        other_hands = [self.get_best_hand(other_deal + table_cards + next_table_cards)
+            other_deals = [tuple(dealt[i:i+2]) for i in 2*np.arange(n)]
+        next_table_cards = tuple(dealt[n_other:])
+        other_hands = [self.get_hand_rank(other_deal + table_cards + next_table_cards)
                        for other_deal in other_deals]
-        this_hand = self.get_best_hand(deal + table_cards + next_table_cards)
+        this_hand = self.get_hand_rank(deal + table_cards + next_table_cards)
         loss = any([other_hand > this_hand for other_hand in other_hands])
         win = all([this_hand > other_hand for other_hand in other_hands])
         return np.array([win, loss, (not win and not loss)])
 
     def get_best_hand(self, cards):
-        return max([Hand(c) for c in combinations(cards, self.hand_n)])
+        ids = [card.id for card in cards]
+        rank = get_evaluator().rank(ids)
+        return Hand(mask_to_cards(get_evaluator().best_five(ids, rank)))
+
+    def get_hand_rank(self, cards):  # comparable like Hand: a higher rank is a better hand
+        return get_evaluator().rank([card.id for card in cards])
+
+
+class Evaluator:  # 5 to 7 card hand ranks from two lookup tables, built once and cached in table_dir
+
+    path = os.path.join(table_dir, 'evaluator.npz')
+    counts = {1: (2, 1, 1, 1), 2: (2, 2, 1), 3: (3, 1, 1), 6: (3, 2), 7: (4, 1)}  # cards per number by category
+
+    def __init__(self, path=None):
+        path = self.path if path is None else path
+        try:
+            with np.load(path) as tables:
+                keys, values, flush = tables['keys'], tables['values'], tables['flush']
+        except (OSError, KeyError, ValueError):
+            keys, values, flush = self.build()
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                np.savez(path, keys=keys, values=values, flush=flush)
+            except OSError:
+                pass
+        self.keys, self.values, self.flush_values = keys, values, flush  # for rank_batch
+        self.non_flush = dict(zip(keys.tolist(), values.tolist()))
+        self.flush = flush.tolist()  # indexed by the 13 bit mask of one suit's numbers
+        self.rank_keys = [5 ** (i // 4) for i in range(Deck.N)]  # base 5 digit per number
+        self.suit_keys = [1 << (3 * (i % 4)) for i in range(Deck.N)]  # 3 bit count per suit
+        self.flush_suit = [-1] * (1 << 12)
+        for key in range(1 << 12):
+            for suit in range(4):
+                if key >> (3 * suit) & 7 >= Deck.hand_n:
+                    self.flush_suit[key] = suit
+        self.batch_keys = np.array(self.rank_keys), np.array(self.suit_keys), np.array(self.flush_suit)
+
+    def rank(self, ids):
+        if stats.enabled:
+            stats.count('hands evaluated')
+        key = suits = 0
+        for i in ids:
+            key += self.rank_keys[i]
+            suits += self.suit_keys[i]
+        value = self.non_flush[key]
+        suit = self.flush_suit[suits]
+        if suit >= 0:
+            numbers = 0
+            for i in ids:
+                if i & 3 == suit:
+                    numbers |= 1 << (i >> 2)
+            value = max([value, self.flush[numbers]])
+        return value
+
+    def rank_batch(self, cards):  # (N, 5 to 7) array of card ids to (N,) ranks
+        cards = np.asarray(cards, dtype=np.int64)
+        if cards.ndim != 2 or not Deck.hand_n <= cards.shape[1] <= 7:
+            raise ValueError('Wrong number of cards')
+        if stats.enabled:
+            stats.count('hands evaluated', len(cards))
+        rank_keys, suit_keys, flush_suit = self.batch_keys
+        values = self.values[np.searchsorted(self.keys, rank_keys[cards].sum(axis=1))]  # number histogram
+        suits = flush_suit[suit_keys[cards].sum(axis=1)]  # suit histogram
+        flushes = np.flatnonzero(suits >= 0)
+        if flushes.size:
+            cards = cards[flushes]
+            numbers = np.where(cards & 3 == suits[flushes, None], 1 << (cards >> 2), 0).sum(axis=1)
+            values[flushes] = np.maximum(values[flushes], self.flush_values[numbers])
+        return values
+
+    def best_five(self, ids, value):  # the five of ids that make up a hand of rank value
+        category, numbers = unpack_rank(value)
+        if category in (5, 8):
+            suit = self.flush_suit[sum([self.suit_keys[i] for i in ids])]
+            ids = [i for i in ids if i & 3 == suit]
+        counts = [1] * Deck.hand_n if category in (0, 4, 5, 8) else self.counts[category]
+        mask = 0
+        for number, count in zip(numbers, counts):
+            for i in sorted(ids, reverse=True):
+                if count and i // 4 == number - 2 and not mask >> i & 1:
+                    mask |= 1 << i
+                    count -= 1
+        return mask
+
+    @staticmethod
+    def build():
+        def straight(numbers):  # like Hand.straight, ace high only
+            for top in range(14, 5, -1):
+                if all([top - i in numbers for i in range(Deck.hand_n)]):
+                    return top
+            return 0
+
+        def non_flush(counts):
+            numbers = sorted(counts, reverse=True)
+            quads = [k for k in numbers if counts[k] == 4]
+            trips = [k for k in numbers if counts[k] == 3]
+            pairs = [k for k in numbers if counts[k] == 2]
+            if quads:
+                return pack_rank(7, [quads[0], max([k for k in numbers if k != quads[0]])])
+            if trips and (len(trips) > 1 or pairs):
+                return pack_rank(6, [trips[0], max(trips[1:] + pairs)])
+            if straight(numbers):
+                return pack_rank(4, [straight(numbers)])
+            if trips:
+                return pack_rank(3, trips[:1] + [k for k in numbers if k != trips[0]][:2])
+            if len(pairs) > 1:
+                return pack_rank(2, pairs[:2] + [max([k for k in numbers if k not in pairs[:2]])])
+            if pairs:
+                return pack_rank(1, pairs[:1] + [k for k in numbers if k != pairs[0]][:3])
+            return pack_rank(0, numbers[:Deck.hand_n])
+
+        def multisets(number, counts, n):
+            if number > 14:
+                if Deck.hand_n <= n <= 7:
+                    yield dict(counts)
+                return
+            for count in range(min([4, 7 - n]) + 1):
+                if count:
+                    counts[number] = count
+                yield from multisets(number + 1, counts, n + count)
+                counts.pop(number, None)
+
+        table = {sum([count * 5 ** (k - 2) for k, count in counts.items()]): non_flush(counts)
+                 for counts in multisets(2, {}, 0)}
+        keys = np.array(sorted(table), dtype=np.int64)
+        values = np.array([table[key] for key in keys.tolist()], dtype=np.int32)
+        flush = np.zeros(1 << Deck.n_names, dtype=np.int32)
+        for mask in range(1 << Deck.n_names):
+            numbers = [k + 2 for k in range(Deck.n_names - 1, -1, -1) if mask >> k & 1]
+            if len(numbers) >= Deck.hand_n:
+                flush[mask] = (pack_rank(8, [straight(numbers)]) if straight(numbers) else
+                               pack_rank(5, numbers[:Deck.hand_n]))
+        return keys, values, flush
+
+
+def pack_rank(category, numbers):  # category in the top bits, then up to five numbers by significance
+    if category in (4, 8):
+        numbers = list(range(numbers[0], numbers[0] - Deck.hand_n, -1))
+    value = category
+    for i in range(Deck.hand_n):
+        value = (value << 4) | (numbers[i] if i < len(numbers) else 0)
+    return value
+
+
+def unpack_rank(value):
+    numbers = [(value >> (4 * (Deck.hand_n - 1 - i))) & 15 for i in range(Deck.hand_n)]
+    return value >> (4 * Deck.hand_n), [number for number in numbers if number]
+
+
+def score_hands(cards, labels=False):  # ranks and Hand.categories indices (or names) of each row of card ids
+    ranks = get_evaluator().rank_batch(cards)
+    categories = ranks >> (4 * Deck.hand_n)
+    return ranks, np.array(Hand.categories)[categories] if labels else categories
+
+
+class PreflopTable:  # win, loss, draw counts for each of the 169 starting hands against 1 to 9 random deals
+
+    path = os.path.join(table_dir, 'preflop.npy')
+
+    def __init__(self, path=None):
+        self.counts = np.load(self.path if path is None else path, mmap_mode='r')
+
+    @staticmethod
+    def hand_class(deal):  # 13 x 13 grid index: pairs on the diagonal, suited above it and offsuit below
+        high, low = sorted([card.id // 4 for card in deal], reverse=True)
+        return high * Deck.n_names + low if deal[0].id % 4 == deal[1].id % 4 else low * Deck.n_names + high
+
+    def lookup(self, deal, n_other_players):
+        if 1 <= n_other_players <= self.counts.shape[1]:
+            return np.array(self.counts[self.hand_class(deal), n_other_players - 1])
+        return None
+
+    @classmethod
+    def build(cls, path=None, n_samples=20000, max_other_players=9, seed=None):
+        path = cls.path if path is None else path
+        deck = Deck(preflop_table=False, rng=seed)
+        counts = np.zeros((Deck.n_names ** 2, max_other_players, 3), dtype=np.int32)
+        for high in range(Deck.n_names):
+            for low in range(Deck.n_names):
+                deal = (Card.deck[4 * max([high, low])], Card.deck[4 * min([high, low]) + (high <= low)])
+                cards = mask_to_cards(Deck.full_mask & ~cards_to_mask(deal))
+                for n in range(1, max_other_players + 1):
+                    counts[high * Deck.n_names + low, n - 1] = deck.mc_batched(deal, (), cards, n=n, size=n_samples)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.save(path, counts)
+        global preflop_table
+        if os.path.abspath(path) == os.path.abspath(cls.path):
+            preflop_table = cls(path)
+        return cls(path)
+
+
+class EquityCache:  # least recently used score_holdem results, keyed on the situation up to suits and card order
+
+    card_maps = [[4 * (i // 4) + suits[i % 4] for i in range(Deck.N)] for suits in permutations(range(4))]
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.enabled = True
+        self.results = OrderedDict()
+        self.hits = self.misses = 0
+
+    def key(self, deal, table_cards, other_deals, dead_mask):  # the same for any relabelling of the suits
+        deal, table_cards = [card.id for card in deal], [card.id for card in table_cards]
+        other_deals = [[card.id for card in other_deal] for other_deal in other_deals or []]
+        dead = mask_to_ids(dead_mask)
+        return min([(tuple(sorted([card_map[i] for i in deal])), tuple(sorted([card_map[i] for i in table_cards])),
+                     tuple(sorted([tuple(sorted([card_map[i] for i in other_deal])) for other_deal in other_deals])),
+                     tuple(sorted([card_map[i] for i in dead]))) for card_map in self.card_maps])
+
+    def get(self, key):
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.results[key] = value
+        self.results.move_to_end(key)
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.results), 'maxsize': self.maxsize}
+
+    def clear(self):
+        self.results.clear()
+        self.hits = self.misses = 0
+
+
+class EquitySession:  # score_holdem for one deal over a hand, keeping its sampled runouts for the later streets
+
+    def __init__(self, deck, deal, n_other_players=1, other_deals=None):
+        self.deck = deck
+        self.deal = tuple(deal)
+        self.n_other_players = n_other_players
+        self.other_deals = None if other_deals is None else [tuple(other_deal) for other_deal in other_deals]
+        self.n_other = 0 if other_deals is not None else deck.deal_n * n_other_players  # leading columns of dealt
+        self.table_cards = None
+        self.dealt = np.zeros((0, 0), dtype=int)  # runouts laid out like Deck.mc_batched samples them
+        self.outcomes = np.zeros(0, dtype=np.int8)  # Deck.runout_outcomes of each row of dealt
+        self.result = self.info = None
+
+    def score(self, table_cards=None, return_info=False):  # like Deck.score_holdem, only sampling what is new
+        table_cards = tuple() if table_cards is None else tuple(table_cards)
+        if table_cards != self.table_cards:
+            with stats.section('equity session'):
+                self.update(table_cards)
+        return (self.result, self.info) if return_info else self.result
+
+    def update(self, table_cards):
+        deck = self.deck
+        counts = deck.tabulate_holdem(self.deal, table_cards, self.n_other_players, self.other_deals)
+        if counts is not None:
+            counts, method = counts
+            self.set_result(table_cards, counts, method, 0)
+            self.dealt, self.outcomes = np.zeros((0, 0), dtype=int), np.zeros(0, dtype=np.int8)
+            return
+        ids = mask_to_ids(deck.unseen_mask(self.deal, table_cards, self.other_deals))
+        kept, kept_dealt, fresh = condition_runouts(self.dealt, self.n_other, self.table_cards, table_cards, ids)
+        results = {'mc': outcome_counts(self.outcomes[kept])}
+        score = outcome_scorer(self.deal, table_cards, self.n_other_players, self.other_deals)
+        batches = deck.sample_runouts(ids, kept_dealt.shape[1], fresh, score, results)
+        self.dealt = np.vstack([kept_dealt] + [dealt for dealt, _ in batches])
+        self.outcomes = np.concatenate([self.outcomes[kept]] + [outcomes for _, outcomes in batches])
+        self.set_result(table_cards, results['mc'], 'mc', len(kept_dealt))
+        if stats.enabled:
+            stats.count('runouts reused', len(kept_dealt))
+            stats.count('runouts mc', len(self.dealt) - len(kept_dealt))
+
+    def set_result(self, table_cards, counts, method, reused):
+        self.table_cards = table_cards
+        self.result = counts / counts.sum()
+        self.info = {'method': method, 'n': int(counts.sum()), 'cached': False, 'reused': reused}
+
+
+class TableEquity:  # score_holdem for every deal at a table, against random deals and each other, in one pass
+
+    def __init__(self, deck, deals, n_other_players=1, actual=True, progress=None):
+        # deals (None for empty seats) have been dealt from deck; predicted scores are against n_other_players
+        # random deals (none if None) and actual ones against the other deals still in; progress(predicted, actual)
+        # is called with the results so far after every monte carlo batch, for a display to refine while it samples
+        self.deck = deck
+        self.progress = progress
+        self.deals = [None if deal is None else tuple(deal) for deal in deals]
+        self.deal_ids = [None if deal is None else card_ids(deal) for deal in deals]
+        self.n_other_players = n_other_players
+        self.actual = actual
+        self.table_cards = self.live = self.boards = None
+        self.n_other = 0  # leading columns of dealt with the random deals
+        self.dealt = np.zeros((0, 0), dtype=int)  # runouts laid out like Deck.mc_batched samples them
+        self.ranks = np.zeros((len(deals), 0), dtype=np.int64)  # each deal's rank in each runout, -1 if not in
+        self.other_ranks = np.zeros(0, dtype=np.int64)  # the best random deal's rank in each runout
+        self.board_ranks = None  # each deal's rank on each of boards when every board is enumerated
+        self.predicted, self.actual_results = [None] * len(deals), [None] * len(deals)
+        self.methods = {}  # (deal index, 'predicted' or 'actual') to 'table', 'exact' or 'mc'
+        self.info = {'n': 0, 'reused': 0}
+
+    def score(self, table_cards=None, live=None):  # predicted and actual [win, loss, draw] lists, None if not in
+        table_cards = tuple() if table_cards is None else tuple(table_cards)
+        live = [i for i, deal in enumerate(self.deals) if deal is not None] if live is None else list(live)
+        if table_cards != self.table_cards:
+            with stats.section('table equity'):
+                self.update(table_cards, live)
+        elif live != self.live:  # folds only change who the actual scores are against
+            self.live = live
+            self.predicted = [result if i in live else None for i, result in enumerate(self.predicted)]
+            if self.actual:
+                ranks = self.ranks if self.board_ranks is None else self.board_ranks
+                for i, counts in live_counts(ranks, live).items():
+                    self.actual_results[i] = counts / counts.sum()
+            self.actual_results = [result if i in live else None for i, result in enumerate(self.actual_results)]
+        return self.predicted, self.actual_results
+
+    def update(self, table_cards, live):
+        deck = self.deck
+        ids = mask_to_ids(deck.unseen_mask((), table_cards, [deal for deal in self.deals if deal is not None]))
+        n_table = deck.hand_n - len(table_cards)
+        self.live, self.methods = live, {}
+        self.predicted, self.actual_results = [None] * len(self.deals), [None] * len(self.deals)
+        mc_predicted = []
+        if self.n_other_players is not None:
+            for i in live:
+                counts = deck.tabulate_holdem(self.deals[i], table_cards, self.n_other_players)
+                if counts is None:
+                    mc_predicted.append(i)
+                else:
+                    self.set_result(self.predicted, i, 'predicted', *counts)
+        self.board_ranks = None
+        if self.actual and count_runouts(len(ids), n_table, 0) <= deck.exact_budget:
+            self.boards = enumerate_runouts(ids, n_table, 0)
+            self.board_ranks, _ = rank_table_runouts(self.deal_ids, card_ids(table_cards), self.boards, live, 0)
+            for i, counts in live_counts(self.board_ranks, live).items():
+                self.set_result(self.actual_results, i, 'actual', counts, 'exact')
+        mc_actual = self.actual and self.board_ranks is None
+        n_other = deck.deal_n * self.n_other_players if mc_predicted else 0
+        if n_other != self.n_other:
+            self.dealt = np.zeros((0, 0), dtype=int)
+            self.ranks, self.other_ranks = self.ranks[:, :0], self.other_ranks[:0]
+        kept, kept_dealt, fresh = condition_runouts(self.dealt, n_other, self.table_cards, table_cards, ids)
+        self.table_cards, self.n_other = table_cards, n_other
+        ranks, other_ranks = self.ranks[:, kept], self.other_ranks[kept]
+        if not mc_predicted and not mc_actual:
+            self.dealt, self.ranks, self.other_ranks = kept_dealt, ranks, other_ranks
+            self.info = {'n': 0, 'reused': 0}
+            return
+        results = table_mc_counts(ranks, other_ranks, live, mc_predicted, mc_actual)
+        score = partial(score_table_runouts, self.deal_ids, card_ids(table_cards), live, n_other, mc_predicted,
+                        mc_actual)
+        batches = deck.sample_runouts(ids, kept_dealt.shape[1], fresh, score, results,
+                                      None if self.progress is None else self.show_progress)
+        self.dealt = np.vstack([kept_dealt] + [dealt for dealt, _ in batches])
+        self.ranks = np.hstack([ranks] + [these[0] for _, these in batches])
+        self.other_ranks = np.concatenate([other_ranks] + [these[1] for _, these in batches])
+        for (i, kind), counts in results.items():
+            self.set_result(self.predicted if kind == 'predicted' else self.actual_results, i, kind, counts, 'mc')
+        self.info = {'n': len(self.dealt), 'reused': len(kept_dealt)}
+        if stats.enabled:
+            stats.count('runouts reused', len(kept_dealt))
+            stats.count('runouts mc', len(self.dealt) - len(kept_dealt))
+
+    def show_progress(self, results):  # progress with the monte carlo results so far in place of the last ones
+        predicted, actual = list(self.predicted), list(self.actual_results)
+        for (i, kind), counts in results.items():
+            (predicted if kind == 'predicted' else actual)[i] = counts / counts.sum()
+        self.progress(predicted, actual)
+
+    def set_result(self, results, i, kind, counts, method):
+        results[i] = counts / counts.sum()
+        self.methods[i, kind] = method
+
+
+class Stats:  # counters and timers of the hot paths, only kept while enabled, and cProfile for chosen sections
+
+    def __init__(self, enabled=False, path=None, dump_every=60.):
+        self.enabled = enabled
+        self.path = path  # JSON lines file that tick appends a snapshot to every dump_every seconds
+        self.dump_every = dump_every
+        self.profile_sections = set()  # section names to run under cProfile, each into its own profiles entry
+        self.profiles = {}
+        self.profiling = False  # only the outermost chosen section is profiled, cProfile does not nest
+        self.counters, self.timers = {}, {}
+        self.start = self.last_dump = time.perf_counter()
+
+    def reset(self):
+        self.counters, self.timers, self.profiles = {}, {}, {}
+        self.start = self.last_dump = time.perf_counter()
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, name, seconds):
+        timer = self.timers.setdefault(name, [0, 0.])
+        timer[0] += 1
+        timer[1] += seconds
+
+    def section(self, name):  # with stats.section(name): times the block, and profiles it if name is chosen
+        return Section(self, name) if self.enabled else no_section
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.start
+        timers = {name: {'n': n, 'total': total, 'mean': total / n} for name, (n, total) in self.timers.items()}
+        return {'time': time.time(), 'elapsed': elapsed, 'counters': dict(self.counters), 'timers': timers,
+                'hands_per_second': self.counters.get('hands', 0) / elapsed if elapsed else 0.}
+
+    def dump(self, path=None):
+        with open(self.path if path is None else path, 'a') as f:
+            f.write(json.dumps(self.snapshot()) + '\n')
+        self.last_dump = time.perf_counter()
+
+    def tick(self):  # dumps a snapshot if there is a path and dump_every seconds have passed
+        if self.enabled and self.path is not None and time.perf_counter() - self.last_dump >= self.dump_every:
+            self.dump()
+
+    def print_profile(self, name, sort='cumulative', n=20):
+        import pstats
+        pstats.Stats(self.profiles[name]).sort_stats(sort).print_stats(n)
+
+
+class Section:
+
+    def __init__(self, stats, name):
+        self.stats, self.name, self.profile, self.start = stats, name, None, 0.
+
+    def __enter__(self):
+        if self.name in self.stats.profile_sections and not self.stats.profiling:
+            self.profile = self.stats.profiles.setdefault(self.name, cProfile.Profile())
+            self.stats.profiling = True
+            self.profile.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        if self.profile is not None:
+            self.profile.disable()
+            self.stats.profiling = False
+        return False
+
+
+class NoSection:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+no_section = NoSection()
+stats = Stats()
+equity_cache = EquityCache()
+preflop_table = None
+
+
+def get_preflop_table():  # the table in table_dir, or False if PreflopTable.build has not made one
+    global preflop_table
+    if preflop_table is None:
+        preflop_table = PreflopTable() if os.path.exists(PreflopTable.path) else False
+    return preflop_table
+
+
+evaluator = None
+
+
+def get_evaluator():
+    global evaluator
+    if evaluator is None:
+        evaluator = Evaluator()
+    return evaluator
 
 
 class Player:
@@ -262,8 +926,8 @@ class Player:
              'Alik', 'Darin', 'Nick', 'Ranger', 'Ginger', 'Francis', 'Marcello',
              'Fabio', 'Rick', 'Bradley', 'Sasquatch']
 
-    def __init__(self, name=None, cash=500, ai=None):
-        self.name = np.random.choice(self.names) if name is None else name
+    def __init__(self, name=None, cash=500, ai=None, rng=None):
+        self.name = make_rng(rng).choice(self.names) if name is None else name
         self.ai = ai
         self.cash = cash
         self.has_folded = False
@@ -289,48 +953,247 @@ class Player:
         self.bet = 0
 
 
+class TableView:  # a copy of a Game's table right after an event, for subscribers drawing it later or elsewhere
+
+    def __init__(self, game):
+        self.hand, self.state, self.turn, self.dealer = game.hands, game.state, game.turn, game.dealer
+        self.pot, self.current_bet, self.big_blind = game.pot, game.current_bet, game.big_blind
+        self.current_human, self.table_cards = game.current_human, game.table_cards
+        self.players = [copy.copy(player) for player in game.players]
+
+
+class GameEvent:  # what Game.emit sends subscribers, only made when one is subscribed to its kind
+
+    kind = None
+
+    def __init__(self, game):
+        self.table = TableView(game)
+
+    def text(self):  # the line of game text it is shown as, None for none
+        return None
+
+
+class DealEvent(GameEvent):  # a hand was dealt and its equities scored
+
+    kind = 'deal'
+
+
+class TurnEvent(GameEvent):  # seat is up, or up again if a human bet too little
+
+    kind = 'turn'
+
+    def __init__(self, game, seat, rejected=False):
+        GameEvent.__init__(self, game)
+        self.seat, self.rejected = seat, rejected
+
+
+class ActionEvent(GameEvent):  # seat did action, one of HandHistory's action_kinds; reason says why an ai was folded
+
+    kind = 'action'
+
+    def __init__(self, game, seat, action, amount=0, reason=None):
+        GameEvent.__init__(self, game)
+        self.seat, self.action, self.amount, self.reason = seat, action, amount, reason
+        self.all_in = amount > 0 and game.players[seat].cash == 0
+
+    def text(self):
+        name = self.table.players[self.seat].name
+        if self.reason is not None:
+            return '%s %s, folding' % (name, self.reason)
+        if self.action == 'blind':
+            return None
+        if self.action == 'fold':
+            return '%s folds' % name
+        if self.all_in:
+            return '%s all in %i' % (name, self.amount)
+        if self.action == 'raise':
+            return '%s raises %i' % (name, self.amount)
+        return '%s %s' % (name, 'calls' if self.action == 'call' else 'checks')
+
+
+class BoardEvent(GameEvent):  # new_cards were added to the table cards and the equities scored again
+
+    kind = 'board'
+
+    def __init__(self, game, new_cards):
+        GameEvent.__init__(self, game)
+        self.new_cards = new_cards
+
+    def text(self):
+        street = {3: 'flop', 4: 'turn', 5: 'river'}[len(self.table.table_cards)]
+        return 'The %s is %s' % (street, ', '.join([card.__repr__() for card in self.new_cards]))
+
+
+class EquityEvent(GameEvent):  # predicted and actual results so far while update_percentages is still sampling
+
+    kind = 'equity'
+
+    def __init__(self, game, predicted, actual):
+        GameEvent.__init__(self, game)
+        self.predicted, self.actual = predicted, actual
+
+
+class ShowdownEvent(GameEvent):  # the hand was played to the end; hands is the best Hand of each seat still in
+
+    kind = 'showdown'
+
+    def __init__(self, game):
+        GameEvent.__init__(self, game)
+        self.hands = {seat: game.deck.get_best_hand(player.deal + game.table_cards)
+                      for seat, player in enumerate(game.players) if not player.has_folded and player.deal is not None}
+
+
+class HandOverEvent(GameEvent):  # winner won pot, with hand or because everyone else folded if hand is None
+
+    kind = 'hand over'
+
+    def __init__(self, game, winner, hand, pot):
+        GameEvent.__init__(self, game)
+        self.winner, self.hand, self.pot = winner, hand, pot
+
+    def text(self):
+        name = self.table.players[self.winner].name
+        return 'Everyone else folded, %s wins' % name if self.hand is None else '%s %s' % (self.hand.get_text(), name)
+
+
+class GameOverEvent(GameEvent):  # winner has all the cash
+
+    kind = 'game over'
+
+    def __init__(self, game, winner):
+        GameEvent.__init__(self, game)
+        self.winner = winner
+
+    def text(self):
+        return '%s wins!' % self.table.players[self.winner].name
+
+
+event_types = [DealEvent, TurnEvent, ActionEvent, BoardEvent, EquityEvent, ShowdownEvent, HandOverEvent, GameOverEvent]
+
+
+class EventQueue:  # a subscriber keeping events for a consumer to take in batches, like a gui once a frame
+
+    def __init__(self, coalesce=('equity',)):
+        self.events = deque()  # appends and pops are safe across threads
+        self.coalesce = set(coalesce)  # kinds only the latest of in a batch is worth showing
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def drain(self):  # the events so far, oldest first, without any coalesced one a later one of its kind replaces
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        latest = {event.kind: i for i, event in enumerate(events) if event.kind in self.coalesce}
+        return [event for i, event in enumerate(events) if event.kind not in self.coalesce or latest[event.kind] == i]
+
+
+def print_event(event):  # the game text of a verbose Game
+    text = event.text()
+    if text is not None:
+        print(text)
+    if event.kind == 'hand over':
+        print(', '.join(['%s: %s' % (player.name, player.cash) for player in event.table.players]))
+
+
 class Game:
 
-    def __init__(self, players, small_blind=1, big_blind=5,  gui=None):
+    streets = ['pre-flop', 'flop', 'turn', 'river']
+
+    def __init__(self, players, small_blind=1, big_blind=5,  gui=None, seed=None, verbose=None, history=None,
+                 deck_options=None):
         self.players = players
+        self.deck_options = {} if deck_options is None else deck_options  # more Deck arguments, like mc_jobs
+        self.history = history  # a TexasHoldemHistory.HandHistory recording every hand, shared with the ais
+        for player in players:
+            if player.ai:
+                player.ai.history = history
+        self.deal_rng, self.mc_rng = spawn_rngs(seed, 2)  # shared by the deck of every hand
         self.n_players = len(players)
         self.small_blind = small_blind
         self.big_blind = big_blind
-        self.gui = gui
+        self.gui = gui  # for its show_predicted and show_actual settings, it draws the game from the events it gets
+        self.subscribers = {}  # event kind to the callbacks emit passes its events to
+        self.verbose = False
+        self.set_verbose(gui is None if verbose is None else verbose)  # print game text when there is no gui
         self.hands = 0
         self.turn = 0
         self.dealer = 0
+        self.state = None  # one of streets while betting, then 'hand over' and finally 'game over'
+        self.current_bet = self.n_in = self.n_all_in = self.n_unmatched = 0  # kept up to date by add_bet and fold
         self.table_cards = self.pot = self.deck = self.current_human = self.raise_player = None
+        self.hand_start = self.street_start = 0.  # perf_counter times, for stats
+        self.equity = None  # the TableEquity of this hand
+
+    def run(self, n_hands=None, until=None, verbose=False):
+        # plays all ai games without a gui until n_hands more hands are over, until(game) is true after a hand
+        # or only one player has cash left; returns the number of hands played
+        if not all([player.ai for player in self.players]):
+            raise ValueError('Every player needs an ai to run without a gui')
+        start = self.hands
+        self.set_verbose(verbose)
+        if self.state is None:
+            self.start_hand()
+        self.play(None if n_hands is None else start + n_hands, until)
+        return self.hands - start
 
     def new_game(self):
+        self.start_hand()
+        self.play()
+
+    def play(self, last_hand=None, until=None):  # acts for ais and all in players until a human has to act
+        while self.state != 'game over':
+            if self.state == 'hand over':
+                if (last_hand is not None and self.hands >= last_hand) or (until is not None and until(self)):
+                    return
+                self.start_hand()
+            elif self.players[self.turn].cash == 0:  # all in
+                self.apply_checkcall()
+            elif self.players[self.turn].ai:
+                self.get_ai_response()
+            else:
+                return
+
+    def start_hand(self):
         self.hands += 1
         self.pot = 0
         self.turn = self.dealer
         self.table_cards = tuple()
-        self.deck = Deck()
+        self.state = self.streets[0]
+        self.deck = Deck(rng=self.deal_rng, mc_rng=self.mc_rng, **self.deck_options)
+        self.equity = None
+        if stats.enabled:
+            self.hand_start = self.street_start = time.perf_counter()
+        with stats.section('deal'):
+            deals, _ = self.deck.deal_table(sum([player.cash > 0 for player in self.players]), 0)
         for player in self.players:
             if player.cash > 0:
-                player.set_deal(self.deck.random_cards(2))
+                player.set_deal(deals.pop(0))
             else:
                 player.set_deal(None)
             if player.ai:
                 player.ai.new_game(player.deal)
+        self.current_bet = self.n_all_in = self.n_unmatched = 0
+        self.n_in = len([player for player in self.players if player.deal is not None])
         self.set_current_human()
+        self.record('start_hand', self.hands, self.dealer, self.players)
         self.update_percentages()
-        if self.gui is not None:
-            self.gui.draw_new_game()
+        self.emit(DealEvent)
         self.blinds()
-        if self.players[self.turn].ai:
-            self.get_ai_response()
 
     def blinds(self):
-        self.next_player()
-        self.pot += self.players[self.turn].make_bet(min([self.players[self.turn].cash, self.small_blind]))
-        self.next_player()
-        self.pot += self.players[self.turn].make_bet(min([self.players[self.turn].cash, self.big_blind]))
+        for blind in (self.small_blind, self.big_blind):
+            self.next_player()
+            amount = min([self.players[self.turn].cash, blind])
+            self.record('action', 0, self.turn, 'blind', amount)
+            self.add_bet(self.players[self.turn], amount)
+            self.emit(ActionEvent, self.turn, 'blind', amount)
         self.raise_player = self.turn
         self.next_player()
-        self.send_to_gui('update_turn')
+        self.emit(TurnEvent, self.turn)
         if self.hands % self.n_players == 0 and self.hands > 0:
             self.small_blind *= 2
             self.big_blind *= 2
@@ -341,64 +1204,111 @@ class Game:
             while self.players[self.current_human].ai:
                 self.current_human = (self.current_human + 1) % self.n_players
 
-    def send_to_gui(self, func, *args):
-        if self.gui is None:
-            if func == 'update_game_text' or func == 'hand_over':
-                print(args[0])
-                if func == 'hand_over':
-                    print(', '.join(['%s: %s' % (player.name, player.cash) for player in self.players]))
-            elif func == 'draw_winner':
-                print('%s wins!' % args[0].name)
-        else:
-            getattr(self.gui, func)(*args)
+    def record(self, func, *args):
+        if self.history is not None:
+            getattr(self.history, func)(*args)
+
+    def subscribe(self, callback, kinds=None):  # callback(event) for every event of kinds (every kind if None)
+        for kind in [event_type.kind for event_type in event_types] if kinds is None else kinds:
+            self.subscribers.setdefault(kind, []).append(callback)
+
+    def unsubscribe(self, callback):
+        for kind in list(self.subscribers):
+            self.subscribers[kind] = [this for this in self.subscribers[kind] if this != callback]
+            if not self.subscribers[kind]:
+                del self.subscribers[kind]
+
+    def emit(self, event_type, *args):  # nothing is made unless some subscriber wants event_type's kind
+        callbacks = self.subscribers.get(event_type.kind)
+        if callbacks:
+            event = event_type(self, *args)
+            for callback in callbacks:
+                callback(event)
+
+    def set_verbose(self, verbose):
+        if verbose != self.verbose:
+            if verbose:
+                self.subscribe(print_event)
+            else:
+                self.unsubscribe(print_event)
+        self.verbose = verbose
 
     def get_bet(self):
-        return max([player.bet for player in self.players])
+        return self.current_bet
+
+    def add_bet(self, player, amount):  # moves amount to the pot and keeps the counts of who still has to call
+        unmatched = not player.has_folded and player.cash > 0 and player.bet < self.current_bet
+        self.pot += player.make_bet(amount)
+        if player.has_folded:
+            return
+        if amount > 0 and player.cash == 0:
+            self.n_all_in += 1
+        if player.bet > self.current_bet:
+            self.current_bet = player.bet
+            self.n_unmatched = self.n_in - self.n_all_in - (player.cash > 0)
+        elif unmatched and (player.bet == self.current_bet or player.cash == 0):
+            self.n_unmatched -= 1
+
+    def fold_player(self, player):
+        if player.cash > 0 and player.bet < self.current_bet:
+            self.n_unmatched -= 1
+        elif player.cash == 0:
+            self.n_all_in -= 1
+        self.n_in -= 1
+        player.fold()
 
     def fold(self):
+        self.apply_fold()
+        self.play()
+
+    def checkcall(self):
+        self.apply_checkcall()
+        self.play()
+
+    def make_bet(self, amount=None):
+        if amount is None:
+            amount = self.gui.get_bet()
+            if amount is None:
+                return
+        if self.apply_bet(amount):
+            self.play()
+
+    def apply_fold(self, reason=None):
         player = self.players[self.turn]
-        self.send_to_gui('update_game_text', '%s folds' % player.name)
-        player.fold()
+        self.record('action', len(self.table_cards), self.turn, 'fold')
+        self.fold_player(player)
         self.update_percentages()
-        self.send_to_gui('update_fold')
+        self.emit(ActionEvent, self.turn, 'fold', 0, reason)
         for player in self.players:
             if player.ai:
                 player.ai.update_turn(player.name, 'fold')
         self.increment_turn()
 
-    def checkcall(self):
-        amount = self.get_bet() - self.players[self.turn].bet
-        if amount < self.players[self.turn].cash or amount == 0:
-            self.send_to_gui('update_game_text', '%s %s' % (self.players[self.turn].name,
-                                                            'calls' if amount > 0 else 'checks'))
-        self.make_bet(amount)
+    def apply_checkcall(self):
+        self.apply_bet(self.current_bet - self.players[self.turn].bet)
 
-    def make_bet(self, amount=None):
-        if amount is None:
-            amount = self.gui.get_bet()
+    def apply_bet(self, amount):  # False if a human bet too little and has to bet again
         player = self.players[self.turn]
         if amount > player.cash:
             amount = player.cash
-        if amount + player.bet > self.get_bet() or amount == player.cash:
-            if amount + player.bet > self.get_bet():
-                self.raise_player = self.turn
-            if amount > 0:
-                if amount == player.cash:
-                    self.send_to_gui('update_game_text', '%s all in %i' % (player.name, amount))
-                else:
-                    self.send_to_gui('update_game_text', '%s raises %i' % (player.name, amount))
-        elif amount + player.bet < self.get_bet():
+        kind, reason = 'raise' if amount + player.bet > self.current_bet else 'check' if amount == 0 else 'call', None
+        if amount + player.bet > self.current_bet:
+            self.raise_player = self.turn
+        elif amount + player.bet < self.current_bet and amount < player.cash:
             if player.ai:
-                self.send_to_gui('update_game_text', '%s ai failed; bet too low, folding' % player.name)
-                player.fold()
+                self.fold_player(player)
+                kind, reason = 'fold', 'ai failed; bet too low'
             elif self.gui is not None:
-                self.send_to_gui('set_bet_entry')
-                return
-        self.pot += player.make_bet(amount)
+                self.emit(TurnEvent, self.turn, True)
+                return False
+        self.record('action', len(self.table_cards), self.turn, kind, amount)
+        self.add_bet(player, amount)
+        self.emit(ActionEvent, self.turn, kind, amount, reason)
         for player in self.players:
             if player.ai:
                 player.ai.update_turn(player.name, ('bet', amount))
         self.increment_turn()
+        return True
 
     def increment_turn(self):
         if self.raise_player is None and not self.players[self.turn].has_folded:
@@ -411,19 +1321,12 @@ class Game:
                     self.hand_over()
                 else:
                     self.next_table_cards()
-                    self.next_turn()
+                    self.emit(TurnEvent, self.turn)
             else:
-                self.next_turn()
+                self.emit(TurnEvent, self.turn)
         else:
             self.hand_over(winner)
 
-    def next_turn(self):
-        self.send_to_gui('update_turn')
-        if self.players[self.turn].cash == 0:  # all in
-            self.checkcall()
-        elif self.players[self.turn].ai:
-            self.get_ai_response()
-
     def next_player(self):
         self.turn = (self.turn + 1) % self.n_players
         while self.players[self.turn].has_folded or self.players[self.turn].deal is None:
@@ -431,38 +1334,56 @@ class Game:
 
     def get_ai_response(self):
         player = self.players[self.turn]
-        response = player.ai.make_decision(player.predicted)
+        with stats.section('ai decision'):
+            response = player.ai.make_decision(player.predicted)
         if response == 'fold':
-            self.fold()
+            self.apply_fold()
         elif response in ['check', 'call']:
-            self.checkcall()
+            self.apply_checkcall()
         elif len(response) == 2 and response[0] == 'bet':
             if response[1] > 0:
-                self.make_bet(response[1])
+                self.apply_bet(response[1])
             else:
-                self.checkcall()
+                self.apply_checkcall()
         else:
-            print('unrecognized response %s, folding' % response)
-            self.fold()
-
-    def update_percentages(self):
-        for player in self.players:
-            if not player.has_folded and player.deal is not None:
-                if player.ai or (self.gui is not None and self.gui.show_predicted):
-                    player.predicted = self.deck.score_holdem(player.deal, self.table_cards,
-                                                              n_other_players=self.n_players-1)
-                if not player.ai and self.gui is not None and self.gui.show_actual:
-                    other_deals = [p.deal for p in self.players if p is not player and p.deal is not None]
-                    player.actual = self.deck.score_holdem(player.deal, self.table_cards, other_deals=other_deals)
+            self.apply_fold('unrecognized response %s' % (response,))
+
+    def update_percentages(self):  # one TableEquity pass for the whole table, kept for the rest of the hand
+        live = [i for i, player in enumerate(self.players) if not player.has_folded and player.deal is not None]
+        if self.equity is None:
+            ais = [player.ai for player in self.players]
+            predicted = any(ais) or (self.gui is not None and self.gui.show_predicted)
+            actual = not all(ais) and self.gui is not None and self.gui.show_actual
+            self.equity = TableEquity(self.deck, [player.deal for player in self.players],
+                                      n_other_players=self.n_players-1 if predicted else None, actual=actual,
+                                      progress=self.equity_progress if 'equity' in self.subscribers else None)
+        predicted, actual = self.equity.score(self.table_cards, live)
+        self.record('equities', len(self.table_cards), predicted)
+        for i in live:
+            player = self.players[i]
+            if player.ai or (self.gui is not None and self.gui.show_predicted):
+                player.predicted = predicted[i]
+            if not player.ai and self.gui is not None and self.gui.show_actual:
+                player.actual = actual[i]
+
+    def equity_progress(self, predicted, actual):  # TableEquity results so far, while update_percentages samples
+        self.emit(EquityEvent, predicted, actual)
 
     def hand_over(self, winner=None):
         if winner is None:
+            self.emit(ShowdownEvent)
             winner, winning_hand = self.get_winner()
-            winner_text = '%s %s' % (winning_hand.get_text(), winner.name)
         else:
-            winner_text = 'Everyone else folded, %s wins' % winner.name
+            winning_hand = None
         winner.cash += self.pot
-        self.send_to_gui('hand_over', winner_text)
+        self.record('end_hand', self.pot, self.players.index(winner), self.players)
+        if stats.enabled:
+            now = time.perf_counter()
+            stats.add_time(self.state, now - self.street_start)
+            stats.add_time('hand', now - self.hand_start)
+            stats.count('hands')
+            stats.tick()
+        self.emit(HandOverEvent, self.players.index(winner), winning_hand, self.pot)
         self.dealer = (self.dealer + 1) % self.n_players
         while not self.players[self.dealer].cash:
             self.dealer = (self.dealer + 1) % self.n_players
@@ -473,49 +1394,253 @@ class Game:
             if player.ai:
                 player.ai.update_result(info)
         if sum([player.cash > 0 for player in self.players]) > 1:
-            self.new_game()
+            self.state = 'hand over'
         else:
-            self.send_to_gui('draw_winner', winner)
+            self.state = 'game over'
+            self.emit(GameOverEvent, self.players.index(winner))
 
     def check_all_call(self):
-        current_bet = self.get_bet()
-        return (all([player.bet == current_bet or player.cash == 0
-                     for player in self.players if not player.has_folded and player.deal is not None]) and
-                self.turn == self.raise_player)
+        return self.n_unmatched == 0 and self.turn == self.raise_player
 
     def check_all_fold(self):
-        players_in = [player for player in self.players if not player.has_folded and player.deal is not None]
-        if len(players_in) == 1:
-            return players_in[0]
+        if self.n_in == 1:
+            return self.players[self.turn]  # next_player only stops at players still in
         return None
 
     def get_winner(self):
-        players_in = [player for player in self.players if player.deal is not None]
-        hands_in = {player: self.deck.get_best_hand(player.deal + self.table_cards) for player in players_in}
+        players_in = [player for player in self.players if not player.has_folded and player.deal is not None]
+        hands_in = {player: self.deck.get_hand_rank(player.deal + self.table_cards) for player in players_in}
         winner = max(hands_in, key=hands_in.get)
-        return winner, hands_in[winner]
+        return winner, self.deck.get_best_hand(winner.deal + self.table_cards)
 
     def next_table_cards(self):
         self.raise_player = None
+        if stats.enabled:
+            now = time.perf_counter()
+            stats.add_time(self.state, now - self.street_start)
+            self.street_start = now
         if len(self.table_cards) == 0:
-            new_cards = self.deck.random_cards(n=3)
-            self.send_to_gui('update_game_text', 'The flop is %s' % ', '.join([c.__repr__() for c in new_cards]))
+            with stats.section('deal'):
+                new_cards = self.deck.random_cards(n=3)
             self.table_cards += new_cards
         elif len(self.table_cards) < 5:
-            new_cards = self.deck.random_cards(n=1)
-            self.send_to_gui('update_game_text', 'The %s is %s' % ('turn' if len(self.table_cards) == 3 else 'river',
-                                                                   ', '.join([c.__repr__() for c in new_cards])))
+            with stats.section('deal'):
+                new_cards = self.deck.random_cards(n=1)
             self.table_cards += new_cards
+        self.record('table_cards', self.table_cards)
+        self.state = self.streets[len(self.table_cards) - 2]
+        self.current_bet = self.n_unmatched = 0
         self.update_percentages()
         for player in self.players:
             player.zero_bet()
             if player.ai:
                 player.ai.update_table_cards(self.table_cards)
-        self.send_to_gui('draw_table_cards')
+        self.emit(BoardEvent, new_cards)
+
+
+suit_order = sorted(Deck.suits)  # card ids order suits alphabetically, like Suit.__lt__
+
+
+def card_id(name, suit):
+    name = str(name)
+    number = Name.name_dict[name] if name in Name.name_dict else int(name)
+    return 4 * (number - 2) + suit_order.index(str(suit))
+
+
+def cards_to_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= card.bit
+    return mask
 
 
-def fac(x):
-    if x <= 0:
-        return 1
+def mask_to_ids(mask):
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def sample_cards(ids, n, size, rng):  # (size, n) array, each row n distinct ids drawn uniformly without replacement
+    return np.asarray(ids)[np.argsort(rng.random((size, len(ids))), axis=1)[:, :n]]
+
+
+def get_mc_delta(old, this):  # old plus this and how far that moved the [win, loss, draw] fractions
+    new = np.add(old, this)
+    return new, 1 if not old.sum() else sum(abs(new / new.sum() - old / old.sum()))
+
+
+def confidence(counts, z=1.96):
+    # standard errors and (3, 2) intervals of the [win, loss, draw] fractions of counts, Agresti-Coull adjusted
+    # so that no fraction is ever certain after a finite sample
+    n = counts.sum() + z ** 2
+    p = (counts + z ** 2 / 2) / n
+    stderr = np.sqrt(p * (1 - p) / n)
+    return stderr, np.clip(np.vstack([p - z * stderr, p + z * stderr]).T, 0, 1)
+
+
+def copy_score(result, info):  # score_holdem's result and info with arrays of their own, so a cached one is not shared
+    return result.copy(), dict(info, stderr=info['stderr'].copy(), ci=info['ci'].copy())
+
+
+def outcome_counts(outcomes):  # [win, loss, draw] counts of an array of Deck.runout_outcomes
+    win, loss = int((outcomes > 0).sum()), int((outcomes < 0).sum())
+    return np.array([win, loss, len(outcomes) - win - loss])
+
+
+def condition_runouts(dealt, n_other, old_table_cards, table_cards, ids):
+    # for runouts sampled with old_table_cards on the table, the rows that dealt the new table cards (a boolean
+    # index) and those rows without the new cards, which keep their outcomes, then the rows without any of the new
+    # cards and with them dropped, which are still a fair sample to score again; rows that dealt the new cards in
+    # any other way or have cards no longer in ids are dropped
+    width = n_other + Deck.hand_n - len(table_cards)
+    n_new = len(table_cards) - len(old_table_cards or ())
+    if old_table_cards is None or n_new < 0 or table_cards[:len(old_table_cards)] != old_table_cards or \
+            dealt.shape[1] != width + n_new:
+        return np.zeros(len(dealt), dtype=bool), np.zeros((0, width), dtype=int), np.zeros((0, width), dtype=int)
+    new = [card.id for card in table_cards[len(old_table_cards):]]
+    live = np.zeros(Deck.N, dtype=bool)
+    live[ids + new] = True
+    valid = live[dealt].all(axis=1)
+    board = dealt[:, n_other:]
+    on_table = np.isin(board, new)
+    kept = valid & (on_table.sum(axis=1) == n_new)
+    fresh = valid & ~np.isin(dealt, new).any(axis=1) if n_new else np.zeros(len(valid), dtype=bool)
+    rest = np.argsort(on_table[kept], axis=1, kind='stable')[:, :board.shape[1] - n_new]  # the unmatched cards
+    return (kept, np.hstack([dealt[kept, :n_other], np.take_along_axis(board[kept], rest, axis=1)]),
+            np.hstack([dealt[fresh, :n_other], board[fresh, n_new:]]))
+
+
+def score_sample(ids, width, size, rng, score):  # a pooled batch of Deck.runout_batches
+    dealt = sample_cards(ids, width, size, rng)
+    return dealt, score(dealt)
+
+
+# the scoring of a batch of runouts on card ids, at module level so that pooled batches pickle for process pools
+
+def card_ids(cards):
+    return tuple([card.id for card in cards])
+
+
+def runout_outcomes(deal, table_cards, dealt, n=None, other_deals=None):  # Deck.runout_outcomes
+    size = len(dealt)
+    n_other = 0 if other_deals is not None else Deck.deal_n*n
+    board = np.hstack([np.tile(table_cards, (size, 1)).astype(int), dealt[:, n_other:]])
+    if other_deals is None:
+        other_deals = [dealt[:, i:i+2] for i in 2*np.arange(n)]
     else:
-        return fac(x - 1) * x
+        other_deals = [np.tile(other_deal, (size, 1)) for other_deal in other_deals]
+    if other_deals:
+        other_hands = get_evaluator().rank_batch(np.vstack([np.hstack([other_deal, board])
+                                                            for other_deal in other_deals]))
+        other_hands = other_hands.reshape(len(other_deals), size).max(axis=0)
+    else:  # nobody to beat
+        other_hands = np.full(size, -1, dtype=np.int64)
+    this_hand = get_evaluator().rank_batch(np.hstack([np.tile(deal, (size, 1)), board]))
+    return np.sign(this_hand - other_hands).astype(np.int8)
+
+
+def score_outcomes(deal, table_cards, n, other_deals, dealt):  # Deck.sample_runouts counts and outcomes of dealt
+    outcomes = runout_outcomes(deal, table_cards, dealt, n, other_deals)
+    return {'mc': outcome_counts(outcomes)}, outcomes
+
+
+def outcome_scorer(deal, table_cards, n, other_deals):  # score_outcomes for Cards, as a picklable score(dealt)
+    return partial(score_outcomes, card_ids(deal), card_ids(table_cards), n,
+                   None if other_deals is None else [card_ids(other_deal) for other_deal in other_deals])
+
+
+def rank_table_runouts(deals, table_cards, dealt, live, n_other):  # ranks of the live deals and best random deal
+    size = len(dealt)
+    board = np.hstack([np.tile(table_cards, (size, 1)).astype(int), dealt[:, n_other:]])
+    hands = [np.hstack([np.tile(deals[i], (size, 1)), board]) for i in live]
+    hands += [np.hstack([dealt[:, j:j+2], board]) for j in range(0, n_other, 2)]
+    all_ranks = get_evaluator().rank_batch(np.vstack(hands)).reshape(len(hands), size)
+    ranks = np.full((len(deals), size), -1, dtype=np.int64)
+    ranks[live] = all_ranks[:len(live)]
+    return ranks, all_ranks[len(live):].max(axis=0) if n_other else np.full(size, -1, dtype=np.int64)
+
+
+def live_counts(ranks, live):  # [win, loss, draw] counts of each live deal against the others still in
+    counts = {}
+    for i in live:
+        others = [j for j in live if j != i]
+        best = ranks[others].max(axis=0) if others else np.full(ranks.shape[1], -1, dtype=np.int64)
+        counts[i] = outcome_counts(np.sign(ranks[i] - best))
+    return counts
+
+
+def table_mc_counts(ranks, other_ranks, live, mc_predicted, mc_actual):  # TableEquity's counts by (deal, kind)
+    counts = {(i, 'predicted'): outcome_counts(np.sign(ranks[i] - other_ranks)) for i in mc_predicted}
+    if mc_actual:
+        counts.update({(i, 'actual'): result for i, result in live_counts(ranks, live).items()})
+    return counts
+
+
+def score_table_runouts(deals, table_cards, live, n_other, mc_predicted, mc_actual, dealt):
+    # Deck.sample_runouts counts of a TableEquity batch, with its ranks and best random deal ranks to keep
+    these = rank_table_runouts(deals, table_cards, dealt, live, n_other)
+    return table_mc_counts(*these, live, mc_predicted, mc_actual), these
+
+
+mc_executors = {}
+mc_executor_types = {'threads': ThreadPoolExecutor, 'processes': ProcessPoolExecutor}
+
+
+def get_mc_executor(kind='threads'):  # a pool of kind with a worker per core, shared by every Deck with mc_jobs > 1
+    if kind not in mc_executor_types:
+        raise ValueError('Unknown executor %s' % (kind,))
+    if kind not in mc_executors:
+        mc_executors[kind] = mc_executor_types[kind](max_workers=os.cpu_count())
+    return mc_executors[kind]
+
+
+def make_rng(seed=None):  # a numpy Generator from a Generator, SeedSequence, int or None (fresh OS entropy)
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def spawn_rngs(seed, n):  # n independent Generators spawned from seed through its SeedSequence
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(n)
+    seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(n)]
+
+
+def count_runouts(n_cards, n_table, n_deals):  # distinct outcomes of dealing n_table cards and n_deals unordered deals
+    return (comb(n_cards, n_table) * comb(n_cards - n_table, Deck.deal_n * n_deals) *
+            int(np.prod(np.arange(Deck.deal_n * n_deals - 1, 0, -2))))
+
+
+def enumerate_runouts(ids, n_table, n_deals):  # every outcome counted by count_runouts, laid out like sample_cards
+    def pairings(cards):
+        if not cards:
+            yield ()
+            return
+        for i in range(1, len(cards)):
+            for rest in pairings(cards[1:i] + cards[i+1:]):
+                yield (cards[0], cards[i]) + rest
+
+    runouts = [deals + table for table in combinations(ids, n_table)
+               for dealt in combinations([i for i in ids if i not in table], Deck.deal_n * n_deals)
+               for deals in pairings(dealt)]
+    return np.array(runouts, dtype=int).reshape(len(runouts), n_table + Deck.deal_n * n_deals)
+
+
+def mask_to_cards(mask):
+    return tuple(Card.deck[i] for i in mask_to_ids(mask))
+
+
+Card.deck = tuple(Card._make(i) for i in range(Deck.N))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Build the lookup tables in %s' % table_dir)
+    parser.add_argument('--preflop', action='store_true', help='also build the preflop equity table (slow)')
+    parser.add_argument('--samples', type=int, default=20000, help='runouts per preflop table entry')
+    args = parser.parse_args()
+    get_evaluator()
+    if args.preflop:
+        PreflopTable.build(n_samples=args.samples)
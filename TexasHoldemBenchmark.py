@@ -0,0 +1,161 @@
+import json
+import numpy as np
+import platform
+import time
+from importlib import import_module
+from itertools import combinations
+from TexasHoldem import Card, Hand, Deck, Player, Game, get_evaluator
+from TexasHoldemTables import Tables
+
+streets = {0: 'pre-flop', 3: 'flop', 4: 'turn', 5: 'river'}
+
+
+def hand_construct(rng):  # one Hand from five random cards
+    cards = [Card.deck[i] for i in rng.choice(Deck.N, Deck.hand_n, replace=False)]
+    return lambda: Hand(cards)
+
+
+def hand_compare(rng):  # the best of the 21 Hands in seven cards, the old way of finding the best hand
+    cards = [Card.deck[i] for i in rng.choice(Deck.N, 7, replace=False)]
+    return lambda: max([Hand(these) for these in combinations(cards, Deck.hand_n)])
+
+
+def get_best_hand(rng):
+    deck, cards = Deck(), [Card.deck[i] for i in rng.choice(Deck.N, 7, replace=False)]
+    return lambda: deck.get_best_hand(cards)
+
+
+def random_cards(rng):  # a fresh deck dealing nine deals and the table
+    return lambda: Deck(rng=rng).deal_table(9)
+
+
+def score_holdem(n_table_cards, n_other_players):
+    def setup(rng):
+        deck = Deck(rng=rng, equity_cache=False)
+        deals, table_cards = deck.deal_table(1, n_table_cards)
+        return lambda: deck.score_holdem(deals[0], table_cards, n_other_players=n_other_players)
+    return setup
+
+
+def game_hand(rng, n_players=6):  # one hand of a headless game of default ais
+    names = Player.names[:n_players]
+    game = {}
+
+    def new_game():
+        players = [Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(name, 10 ** 6, names, rng=rng),
+                          name=name, cash=10 ** 6) for name in names]
+        game['game'] = Game(players, small_blind=1, big_blind=2, seed=rng, verbose=False)
+
+    def play():
+        if 'game' not in game or game['game'].state == 'game over':
+            new_game()
+        game['game'].small_blind, game['game'].big_blind = 1, 2  # no blinds doubling every round
+        game['game'].run(n_hands=1)
+    return play
+
+
+def tables_hands(rng, n_tables=100, n_seats=6):  # one hand at each of n_tables vectorized tables of batch ais
+    tables = {}
+
+    def play():
+        if 'tables' not in tables or (tables['tables'].cash > 0).sum(axis=1).min() < 2:
+            tables['tables'] = Tables(n_tables, n_seats, cash=10 ** 6, small_blind=1, big_blind=2, seed=rng)
+        tables['tables'].run(n_hands=1)
+    return play
+
+
+benchmarks = {'hand_construct': hand_construct, 'hand_compare': hand_compare, 'get_best_hand': get_best_hand,
+              'random_cards': random_cards, 'game_hand': game_hand,
+              'tables_100_hands': tables_hands}
+for n_table_cards, street in streets.items():
+    for n_other_players in (1, 3, 8):
+        benchmarks['score_holdem_%s_%i' % (street, n_other_players)] = score_holdem(n_table_cards, n_other_players)
+
+
+def time_benchmark(setup, min_time=0.2, repeat=5, seed=0):
+    # seconds per call of the function setup(rng) returns: the median of repeat runs of at least min_time each
+    rng = np.random.default_rng(seed)
+    func = setup(rng)
+    func()  # warm up, building or loading any tables
+    n, elapsed = 1, 0
+    while True:  # calls per run
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat:
+            break
+        n *= 2
+    times = [elapsed / n]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        times.append((time.perf_counter() - start) / n)
+    return float(np.median(times))
+
+
+def run_benchmarks(names=None, min_time=0.2, repeat=5, seed=0, callback=None):
+    # seconds per call of each benchmark, passing each to callback(name, seconds) as it finishes
+    get_evaluator()
+    results = {}
+    for name in benchmarks if names is None else names:
+        results[name] = time_benchmark(benchmarks[name], min_time, repeat, seed)
+        if callback is not None:
+            callback(name, results[name])
+    return results
+
+
+def compare(results, baseline):  # (name, baseline, result, ratio) of each benchmark in both
+    return [(name, baseline[name], results[name], results[name] / baseline[name])
+            for name in results if name in baseline and baseline[name] > 0]
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump({'results': results, 'python': platform.python_version(), 'numpy': np.__version__,
+                   'machine': platform.platform(), 'time': time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=1)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description='Time the engine hot paths, optionally against a saved baseline')
+    parser.add_argument('benchmarks', nargs='*', help='benchmarks to run, or substrings of their names (default: all)')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    parser.add_argument('--min-time', type=float, default=1., help='seconds to spend on each benchmark at least')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark, the median is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fail if a benchmark is this fraction slower than the baseline')
+    args = parser.parse_args()
+    if args.list:
+        print('\n'.join(benchmarks))
+        sys.exit()
+    names = [name for name in benchmarks if not args.benchmarks or any([b in name for b in args.benchmarks])]
+
+    def progress(name, seconds):
+        print('%-32s %12.3f us' % (name, seconds * 1e6))
+
+    results = run_benchmarks(names, args.min_time, args.repeat, args.seed, progress)
+    if args.save:
+        save(results, args.save)
+    if args.baseline:
+        print('\n%-32s %12s %12s %8s' % ('benchmark', 'baseline us', 'now us', 'ratio'))
+        regressions = []
+        for name, before, after, ratio in compare(results, load(args.baseline)):
+            regressed = ratio > 1 + args.threshold
+            print('%-32s %12.3f %12.3f %8.2f%s' % (name, before * 1e6, after * 1e6, ratio,
+                                                    '  slower' if regressed else ''))
+            if regressed:
+                regressions.append(name)
+        if regressions:
+            print('\n%i regression(s) over %i%%: %s' % (len(regressions), args.threshold * 100, ', '.join(regressions)))
+            sys.exit(1)
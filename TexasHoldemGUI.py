@@ -1,8 +1,8 @@
-from tkinter import Tk, Canvas, Frame, Button, Entry, messagebox
-from TexasHoldem import Deck, Player, Game
+from tkinter import Tk, Canvas, Frame, Button, Entry, PhotoImage, messagebox
+from TexasHoldem import Deck, Player, Game, EventQueue
 import numpy as np
 from importlib import import_module
-import time, os
+import base64, os, queue, struct, threading, traceback, zlib
 
 
 class TexasHoldemGUI(Frame):
@@ -16,6 +16,8 @@ class TexasHoldemGUI(Frame):
                              0.55, 0.00, 0.55, 0.25, 0.60, 0.10, 0.80, 0.25,
                              0.65, 0.45, 0.55, 0.40, 0.65, 0.75, 0.50, 0.90],
                    'Diamonds': [0.50, 0.00, 0.75, 0.50, 0.50, 1.00, 0.25, 0.50, 0.50, 0.00]}
+    frame_ms = 33  # how often the Tk thread draws the events the engine has sent
+    ai_pause_ms = 500  # before showing what happens after an ai's turn or new table cards
 
     def __init__(self, tk_root):
         self.root = tk_root
@@ -28,10 +30,20 @@ class TexasHoldemGUI(Frame):
         size = min([self.height, self.width])
         self.card_size = [size/10, size/6]
         self.font = ('Helvetica', int(self.width/50))
-        self.table_card_canvases = []
+        self.sprites = CardSprites(self.root, self.card_size, self.suit_coords)
+        self.table_card_canvases, self.table_card_slots = [], []
+        self.deck_items, self.seats = [], []
         self.fold_button = self.call_check_button = self.bet_button = self.bet_entry = self.pot_text = None
         self.show_predicted = self.show_actual = self.game_text = self.game_text_list = self.game = None
         self.n_human = None
+        self.engine = None
+        self.events = EventQueue()  # what the engine thread has done, drawn by poll a frame at a time
+        self.pending = []  # drained events not drawn yet, waiting out a pause
+        self.table = None  # the TableView of the event being drawn
+        self.pause = 0  # ms to wait before drawing the next event, set by the one just drawn
+        self.handlers = {'deal': self.draw_new_game, 'turn': self.update_turn, 'action': self.update_action,
+                         'board': self.draw_table_cards, 'equity': self.update_equity, 'hand over': self.hand_over,
+                         'game over': self.draw_winner}
 
     def start_game(self, n_players=5, cash=500, small_blind=1, big_blind=5,
                    show_predicted=True, show_actual=True, ai_names=None,
@@ -53,12 +65,15 @@ class TexasHoldemGUI(Frame):
             players.append(
                 Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(names[-i], cash, names),
                        name=names[-i], cash=cash))
+        self.engine = Engine()
         self.game = Game(players, small_blind=small_blind, big_blind=big_blind,  gui=self)
+        self.game.subscribe(self.events, list(self.handlers))
         x0, y0, dy = (self.width-self.width/(int(n_players/2)+1))/self.width, 2./3, 1./9
-        self.fold_button = self.get_button([x0, 1.0, y0, y0+dy], 'Fold', self.game.fold)
+        self.fold_button = self.get_button([x0, 1.0, y0, y0+dy], 'Fold', lambda: self.command(self.game.fold))
         self.call_check_button = \
-            self.get_button([x0, 1.0, y0+dy, y0+2*dy], 'Call\t%s' % self.game.big_blind, self.game.checkcall)
-        self.bet_button = self.get_button([x0, x0+(1.0-x0)/2, y0+2*dy, y0+3*dy], 'Bet', self.game.make_bet)
+            self.get_button([x0, 1.0, y0+dy, y0+2*dy], 'Call\t%s' % self.game.big_blind,
+                            lambda: self.command(self.game.checkcall))
+        self.bet_button = self.get_button([x0, x0+(1.0-x0)/2, y0+2*dy, y0+3*dy], 'Bet', self.bet)
         self.bet_entry = self.get_entry([x0+(1.0-x0)/2, 1.0, y0+2*dy, y0+3*dy])
         self.pot_text = self.canvas.create_text(self.width*3/4, self.height/2, text='Pot\t0', fill='white',
                                                 font=self.font)
@@ -71,159 +86,164 @@ class TexasHoldemGUI(Frame):
                                                 1/2 - card_ratio[1]/2, 1/2 + card_ratio[1]/2,
                                                 highlight=False)
             self.table_card_canvases.append(table_card_canvas)
-        self.game.new_game()
+            self.table_card_slots.append(CardSlot(table_card_canvas, self.sprites, 0, 0))
+        self.engine.start(self.game.new_game)
+        self.root.after(self.frame_ms, self.poll)
 
-    def draw_new_game(self):
+    def poll(self):  # draws the events the engine has sent, stopping for any pause one asks for, then polls again
+        self.pause = 0
+        try:
+            if not self.pending:
+                self.pending = self.events.drain()
+            while self.pending and not self.pause:
+                event = self.pending.pop(0)
+                self.table = event.table
+                self.handlers[event.kind](event)
+        finally:
+            self.root.after(self.pause or self.frame_ms, self.poll)
+
+    def command(self, func, *args):  # a human's action, once everything before it has been drawn
+        if not self.pending and not len(self.events):
+            self.engine.command(func, *args)
+
+    def bet(self):
+        amount = self.get_bet()
+        if amount is not None:
+            self.command(self.game.make_bet, amount)
+
+    def draw_new_game(self, event):
         self.draw_deck()
         self.draw_players()
         self.player_up()
         self.set_bet_entry()
         self.update_dealer()
-        self.root.update()
 
     def player_up(self):
-        for player in self.game.players:
+        for seat, player in zip(self.seats, self.table.players):
             if not player.has_folded:
-                player.canvas.config({'highlightbackground': 'white'})
-        self.game.players[self.game.turn].canvas.config({'highlightbackground': 'yellow'})
-        self.canvas.itemconfig(self.pot_text, text='Pot\t%i' % self.game.pot)
-        for player in self.game.players:
-            player.canvas.itemconfig(player.cash_text, text='Cash %s' % player.cash)
-            player.canvas.itemconfig(player.bet_text, text='Bet %s' % player.bet)
-            if player.predicted is not None and not player.ai:
-                w, l, d = player.predicted
-                player.canvas.itemconfig(player.predicted_text,
-                                         text='Predicted\nWin: %.2f\nLoss: %.2f\nDraw: %.2f' % (w, l, d))
-            if player.actual is not None and not player.ai:
-                w, l, d = player.actual
-                player.canvas.itemconfig(player.actual_text,
-                                         text='Actual\nWin: %.2f\nLoss: %.2f\nDraw: %.2f' % (w, l, d))
-        self.root.update()
+                seat.canvas.config({'highlightbackground': 'white'})
+        self.seats[self.table.turn].canvas.config({'highlightbackground': 'yellow'})
+        self.canvas.itemconfig(self.pot_text, text='Pot\t%i' % self.table.pot)
+        for seat, player in zip(self.seats, self.table.players):
+            seat.canvas.itemconfig(seat.cash_text, text='Cash %s' % player.cash)
+            seat.canvas.itemconfig(seat.bet_text, text='Bet %s' % player.bet)
+            self.show_equity(seat, player, player.predicted, player.actual)
+
+    def show_equity(self, seat, player, predicted, actual):
+        if predicted is not None and not player.ai and seat.predicted_text is not None:
+            seat.canvas.itemconfig(seat.predicted_text,
+                                   text='Predicted\nWin: %.2f\nLoss: %.2f\nDraw: %.2f' % tuple(predicted))
+        if actual is not None and not player.ai and seat.actual_text is not None:
+            seat.canvas.itemconfig(seat.actual_text, text='Actual\nWin: %.2f\nLoss: %.2f\nDraw: %.2f' % tuple(actual))
+
+    def update_equity(self, event):  # results so far, sent while the engine is still sampling
+        for seat, player, predicted, actual in zip(self.seats, self.table.players, event.predicted, event.actual):
+            self.show_equity(seat, player, predicted if self.show_predicted else None,
+                             actual if self.show_actual else None)
 
     def update_game_text(self, text):
         self.game_text_list.append(text)
         self.canvas.itemconfig(self.game_text, text=text)
 
-    def hand_over(self, winner_text):
-        for player in self.game.players:
-            if not player.has_folded:
-                self.draw_deal(player, up=True)
-        self.root.update()
-        self.game_text_list.append(winner_text)
-        messagebox.showinfo('Hand Over', winner_text)
-        for table_card_canvas in self.table_card_canvases:
-            table_card_canvas.delete('all')
+    def update_action(self, event):
+        text = event.text()
+        if text is not None:
+            self.update_game_text(text)
+        if event.action == 'fold':
+            self.update_fold(event.seat)
+
+    def hand_over(self, event):
+        for seat, player in zip(self.seats, self.table.players):
+            if not player.has_folded and player.deal is not None:
+                self.draw_deal(seat, player, up=True)
+        self.game_text_list.append(event.text())
+        messagebox.showinfo('Hand Over', event.text())
+        for table_card_canvas, slot in zip(self.table_card_canvases, self.table_card_slots):
+            slot.hide()
             table_card_canvas.config({'highlightbackground': 'green'})
         self.player_up()
-        self.root.update()
 
-    def update_turn(self):
-        player = self.game.players[self.game.turn]
-        if self.n_human > 1 and self.game.current_human == self.game.turn:
-            name = self.game.players[self.game.turn].name
+    def update_turn(self, event):
+        if event.rejected:  # a human bet too little
+            self.set_bet_entry()
+            return
+        player = self.table.players[event.seat]
+        if self.n_human > 1 and self.table.current_human == event.seat:
             this_game_text = [self.game_text_list[-1]]
             i = 2
-            while i < len(self.game_text_list) + 1 and name not in self.game_text_list[-i]:
+            while i < len(self.game_text_list) + 1 and player.name not in self.game_text_list[-i]:
                 this_game_text.append(self.game_text_list[-i])
                 i += 1
-            messagebox.showinfo('%s\'s turn' % name, '\n'.join(this_game_text[::-1]))
-            self.draw_deal(player, up=True)
-        elif self.n_human == 1 and self.game.current_human == self.game.turn:
+            messagebox.showinfo('%s\'s turn' % player.name, '\n'.join(this_game_text[::-1]))
+            self.draw_deal(self.seats[event.seat], player, up=True)
+        elif self.n_human == 1 and self.table.current_human == event.seat:
             self.update_game_text('%s\'s turn' % player.name)
-            self.draw_deal(player, up=True)
-        call_amount = self.game.get_bet() - self.game.players[self.game.turn].bet
+            self.draw_deal(self.seats[event.seat], player, up=True)
+        call_amount = self.table.current_bet - player.bet
         call_check_text = 'Call\t%s' % call_amount if call_amount else 'Check'
         self.call_check_button.config(text=call_check_text)
         self.set_bet_entry()
         self.player_up()
-        if not self.game.current_human == self.game.turn:
-            time.sleep(0.5)
-
-    def update_fold(self):
-        player = self.game.players[self.game.turn]
-        self.draw_deal(player, up=False)
-        player.canvas.config({'highlightbackground': 'red'})
-
-    def draw_card(self, card, canvas, x0, x1, y0, y1, up=True):
-        dx = x1-x0
-        dy = y1-y0
-        canvas.create_rectangle(x0, y0, x1, y1, fill='white' if up else 'red', outline='white', tag=card.__repr__)
-        if up:
-            draw_suit(card.suit, canvas, x1 - dx / 2, x1 - dx / 3, y0 + dy / 5, y0 + dy / 3, card.__repr__(),
-                      self.suit_coords[card.suit.name])
-            draw_suit(card.suit, canvas, x0 + dx / 3, x0 + dx / 2, y1 - dy / 3, y1 - dy / 5, card.__repr__(),
-                      self.suit_coords[card.suit.name])
-            draw_name(card.name, canvas, x1 - dx / 4, y0 + dy / 4, card.__repr__(), card.suit.color)
-            draw_name(card.name, canvas, x0 + dx / 4, y1 - dy / 4, card.__repr__(), card.suit.color)
-
-    def draw_deck(self, delta=0.1):
-        x0, x1 = self.width / 10, self.width / 10 + self.card_size[0]
-        y0, y1 = self.height / 2 - self.card_size[1] / 2, self.height / 2 + self.card_size[1] / 2
-        for i in range(min([5, len(self.game.deck.cards)])):
-            self.canvas.create_rectangle(x0+i*(x1-x0)*delta, y0, x1+i*(x1-x0)*delta, y1, fill='red', outline='white')
-
-    def draw_player(self, player, canvas, up=False):
-        player.canvas = canvas
-        player.height, player.width = float(player.canvas['height']), float(player.canvas['width'])
-        player.x_center, player.y_center = player.width/2, player.height/2
-        player.font = ('Helvetica', int(player.width/15))
-        player.dealer_icon = None
-        player.dealer_text = None
-        player.canvas.create_text(player.x_center, player.height / 12, text=player.name, fill='white', font=player.font)
-        if player.deal is not None:
-            self.draw_deal(player, up=up)
-        self.updatables(player)
-
-    def draw_winner(self, player):
+        if not self.table.current_human == event.seat:
+            self.pause = self.ai_pause_ms
+
+    def update_fold(self, i):
+        self.draw_deal(self.seats[i], self.table.players[i], up=False)
+        self.seats[i].canvas.config({'highlightbackground': 'red'})
+
+    def draw_deck(self, delta=0.1):  # a stack of backs, made on the first hand and left as it is
+        if not self.deck_items:
+            x0, y0 = self.width / 10, self.height / 2 - self.card_size[1] / 2
+            for i in range(5):
+                self.deck_items.append(self.canvas.create_image(x0 + i * self.card_size[0] * delta, y0, anchor='nw',
+                                                                image=self.sprites.get(None, up=False)))
+
+    def draw_player(self, player, canvas):  # a Seat with every item of a player's canvas
+        seat = Seat(canvas)
+        seat.canvas.create_text(seat.x_center, seat.height / 12, text=player.name, fill='white',
+                                font=('Helvetica', int(seat.width/15)))
+        seat.slots = [CardSlot(canvas, self.sprites, seat.x_center - self.card_size[0] - seat.width / 100,
+                               seat.y_center - self.card_size[1] / 2),
+                      CardSlot(canvas, self.sprites, seat.x_center + seat.width / 100,
+                               seat.y_center - self.card_size[1] / 2)]
+        self.updatables(seat, player)
+        return seat
+
+    def draw_winner(self, event):
         self.canvas.delete('all')
-        self.canvas.create_text(self.width/2, self.height/2, text='%s wins!' % player.name)
-
-    def draw_deal(self, player, up=True):
-        self.draw_card(player.deal[0], player.canvas,
-                       player.x_center-self.card_size[0]-player.width/100, player.x_center-player.width/100,
-                       player.y_center+self.card_size[1]/2, player.y_center-self.card_size[1]/2,
-                       up=up)
-        self.draw_card(player.deal[1], player.canvas,
-                       player.x_center+player.width/100,  player.x_center+self.card_size[0]+player.width/100,
-                       player.y_center+self.card_size[1]/2, player.y_center-self.card_size[1]/2,
-                       up=up)
-
-    def updatables(self, player):
-        if player.predicted is not None and not player.ai:
-            player.predicted_text = \
-                player.canvas.create_text(player.x_center/3, player.height/4, width=player.x_center-self.card_size[0],
-                                          text='', fill='white')
-        if player.actual is not None and not player.ai:
-            player.actual_text = \
-                player.canvas.create_text(player.x_center/3, player.height*3/4, width=player.x_center-self.card_size[0],
-                                          text='', fill='white')
-        player.cash_text = \
-            player.canvas.create_text(5*player.x_center/3, player.height/4, width=player.x_center-self.card_size[0],
-                                      text='Cash %s' % player.cash, fill='white')
-        player.bet_text = \
-            player.canvas.create_text(player.x_center, player.height*7/8, width=player.x_center-self.card_size[0],
-                                      text='Bet %s' % player.bet, fill='white')
-        player.dealer_icon = None
-        player.dealer_text = None
+        self.canvas.create_text(self.width/2, self.height/2, text=event.text())
+
+    def draw_deal(self, seat, player, up=True):
+        for slot, card in zip(seat.slots, player.deal):
+            slot.show(card, up=up)
+
+    def updatables(self, seat, player):
+        if self.show_predicted and not player.ai:
+            seat.predicted_text = \
+                seat.canvas.create_text(seat.x_center/3, seat.height/4, width=seat.x_center-self.card_size[0],
+                                        text='', fill='white')
+        if self.show_actual and not player.ai:
+            seat.actual_text = \
+                seat.canvas.create_text(seat.x_center/3, seat.height*3/4, width=seat.x_center-self.card_size[0],
+                                        text='', fill='white')
+        seat.cash_text = \
+            seat.canvas.create_text(5*seat.x_center/3, seat.height/4, width=seat.x_center-self.card_size[0],
+                                    text='Cash %s' % player.cash, fill='white')
+        seat.bet_text = \
+            seat.canvas.create_text(seat.x_center, seat.height*7/8, width=seat.x_center-self.card_size[0],
+                                    text='Bet %s' % player.bet, fill='white')
+        seat.dealer_icon = \
+            seat.canvas.create_oval(3*seat.x_center/2, seat.height*3/4+seat.width/12,
+                                    11*seat.x_center/6, seat.height*3/4-seat.width/12,
+                                    fill='red', width=0, state='hidden')
+        seat.dealer_text = \
+            seat.canvas.create_text(5*seat.x_center/3, seat.height*3/4, width=seat.x_center-self.card_size[0],
+                                    text='D', fill='white', state='hidden')
 
     def update_dealer(self):
-        for i, player in enumerate(self.game.players):
-            if self.game.dealer == i:
-                player.dealer_icon = \
-                    player.canvas.create_oval(3*player.x_center/2, player.height*3/4+player.width/12,
-                                              11*player.x_center/6, player.height*3/4-player.width/12,
-                                              fill='red', width=0)
-                player.dealer_text = \
-                    player.canvas.create_text(5*player.x_center/3, player.height*3/4,
-                                              width=player.x_center-self.card_size[0],
-                                              text='D', fill='white')
-            else:
-                if player.dealer_icon is not None:
-                    player.canvas.delete(player.dealer_icon)
-                    player.dealer_icon = None
-                if player.dealer_text is not None:
-                    player.canvas.delete(player.dealer_text)
-                    player.dealer_text = None
+        for i, seat in enumerate(self.seats):
+            for item in (seat.dealer_icon, seat.dealer_text):
+                seat.canvas.itemconfig(item, state='normal' if self.table.dealer == i else 'hidden')
 
     def draw_players(self):
         def get_player_loc(j, n_players):  # clockwise order
@@ -231,17 +251,27 @@ class TexasHoldemGUI(Frame):
             n = int(np.ceil(n_players / 2)) if row else int(n_players / 2) + 1
             j = j - int(n_players / 2) if row else int(n_players / 2) - j - 1
             return j / n, (j + 1) / n, 0 if row else 2 / 3, 1 / 3 if row else 1
-        for i, player in enumerate(self.game.players):
-            self.draw_player(player, self.get_canvas(*get_player_loc(i, self.game.n_players)),
-                             up=not player.ai and self.game.turn == i)
+        n_players = len(self.table.players)
+        for i, player in enumerate(self.table.players):
+            if i == len(self.seats):  # the first hand
+                self.seats.append(self.draw_player(player, self.get_canvas(*get_player_loc(i, n_players))))
+            seat = self.seats[i]
+            for text in (seat.predicted_text, seat.actual_text):
+                if text is not None:
+                    seat.canvas.itemconfig(text, text='')
+            if player.deal is None:
+                for slot in seat.slots:
+                    slot.hide()
+            else:
+                self.draw_deal(seat, player, up=not player.ai and self.table.turn == i)
 
-    def draw_table_cards(self):
-        for i, card in enumerate(self.game.table_cards):
+    def draw_table_cards(self, event):
+        self.update_game_text(event.text())
+        for i, card in enumerate(self.table.table_cards):
             self.table_card_canvases[i].config({'highlightbackground': 'white'})
-            self.draw_card(card, self.table_card_canvases[i], 0, self.card_size[0], self.card_size[1], 0)
+            self.table_card_slots[i].show(card)
         self.player_up()
-        self.root.update()
-        time.sleep(0.5)
+        self.pause = self.ai_pause_ms
 
     def get_bet(self):
         try:
@@ -254,7 +284,7 @@ class TexasHoldemGUI(Frame):
 
     def set_bet_entry(self):
         self.bet_entry.delete(0, 'end')
-        self.bet_entry.insert(0, max([2*self.game.big_blind, (2*self.game.get_bet())]))
+        self.bet_entry.insert(0, max([2*self.table.big_blind, (2*self.table.current_bet)]))
 
     def get_canvas(self, x0, x1, y0, y1, highlight=True):
         canvas = Canvas(self.root, borderwidth=1, highlightbackground='white' if highlight else 'green',
@@ -285,13 +315,124 @@ class TexasHoldemGUI(Frame):
         return entry
 
 
-def draw_name(name, canvas, x0, y0, tag, color):
-    canvas.create_text(x0, y0, text=name.name if len(name.name) < 3 else name.name[0], fill=color, tag=tag)
-
-
-def draw_suit(suit, canvas, x0, x1, y0, y1, tag, coords):
-    coords = [y0 + c * (y1 - y0) if i % 2 else x0 + c * (x1 - x0) for i, c in enumerate(coords)]
-    canvas.create_polygon(coords, fill=suit.color, tag=tag)
+class Engine:  # runs game methods on a worker thread, so sampling and ais never block the Tk thread
+
+    def __init__(self):
+        self.commands = queue.Queue()  # (func, args) for the worker to run
+        self.idle = threading.Event()  # set while the game waits on a human
+        self.thread = threading.Thread(target=self.work, daemon=True)
+
+    def start(self, func, *args):
+        self.commands.put((func, args))
+        self.thread.start()
+
+    def command(self, func, *args):  # from the Tk thread; ignored unless a human is up and nothing else is running
+        if self.idle.is_set():
+            self.idle.clear()
+            self.commands.put((func, args))
+
+    def work(self):
+        while True:
+            func, args = self.commands.get()
+            try:
+                func(*args)
+            except Exception:
+                traceback.print_exc()
+            self.idle.set()
+
+
+class Seat:  # a player's canvas and its items, made on the first hand and changed in place after that
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.height, self.width = float(canvas['height']), float(canvas['width'])
+        self.x_center, self.y_center = self.width/2, self.height/2
+        self.slots = []
+        self.predicted_text = self.actual_text = self.cash_text = self.bet_text = None
+        self.dealer_icon = self.dealer_text = None
+
+
+class CardSprites:  # each card face and the back rendered once, on first use, as a PhotoImage of one card size
+
+    def __init__(self, root, card_size, suit_coords):
+        self.root = root
+        self.width, self.height = [max([2, int(round(size))]) for size in card_size]
+        self.suit_coords = suit_coords
+        self.images = {}  # card id, or 'back', to its PhotoImage; Tk drops images nothing in python refers to
+
+    def get(self, card, up=True):
+        key = card.id if up else 'back'
+        if key not in self.images:
+            pixels = self.render_face(card) if up else self.render_back()
+            self.images[key] = PhotoImage(master=self.root, data=png_data(pixels), format='png')
+        return self.images[key]
+
+    def rgb(self, color):
+        return [c >> 8 for c in self.root.winfo_rgb(color)]
+
+    def render_back(self):
+        pixels = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        pixels[...] = self.rgb('white')
+        pixels[1:-1, 1:-1] = self.rgb('red')
+        return pixels
+
+    def render_face(self, card):  # white with a suit in the top and bottom halves, names are CardSlot text
+        pixels = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        pixels[...] = self.rgb('white')
+        w, h = self.width, self.height
+        for x0, x1, y0, y1 in [(w / 2, w * 2 / 3, h * 4 / 5, h * 2 / 3), (w / 3, w / 2, h / 3, h / 5)]:
+            coords = self.suit_coords[card.suit.name]
+            fill_polygon(pixels, [x0 + c * (x1 - x0) for c in coords[::2]], [y0 + c * (y1 - y0) for c in coords[1::2]],
+                         self.rgb(card.suit.color))
+        return pixels
+
+
+class CardSlot:  # where a card goes on a canvas, an image and two name items made once and changed in place
+
+    def __init__(self, canvas, sprites, x, y):
+        self.canvas, self.sprites = canvas, sprites
+        w, h = sprites.width, sprites.height
+        self.image = canvas.create_image(x, y, anchor='nw', state='hidden')
+        self.names = [canvas.create_text(x + w * 3 / 4, y + h * 3 / 4, state='hidden'),
+                      canvas.create_text(x + w / 4, y + h / 4, state='hidden')]
+        self.shown = None  # (card, up), or None while hidden
+
+    def show(self, card, up=True):
+        if self.shown == (card, up):
+            return
+        self.shown = (card, up)
+        self.canvas.itemconfig(self.image, image=self.sprites.get(card, up), state='normal')
+        name = card.name.name if len(card.name.name) < 3 else card.name.name[0]
+        for item in self.names:
+            self.canvas.itemconfig(item, text=name, fill=card.suit.color, state='normal' if up else 'hidden')
+
+    def hide(self):
+        if self.shown is not None:
+            self.shown = None
+            for item in [self.image] + self.names:
+                self.canvas.itemconfig(item, state='hidden')
+
+
+def fill_polygon(pixels, xs, ys, color):  # even-odd fill of the pixels whose centres are inside the polygon
+    height, width, _ = pixels.shape
+    px, py = np.meshgrid(np.arange(width) + 0.5, np.arange(height) + 0.5)
+    inside = np.zeros((height, width), dtype=bool)
+    for x0, y0, x1, y1 in zip(xs, ys, xs[1:] + xs[:1], ys[1:] + ys[:1]):
+        if y0 != y1:
+            crosses = (y0 > py) != (y1 > py)
+            inside ^= crosses & (px < x0 + (py - y0) * (x1 - x0) / (y1 - y0))
+    pixels[inside] = color
+
+
+def png_data(pixels):  # base64 PNG of (height, width, 3) uint8 pixels, which Tk reads without an imaging library
+    height, width, _ = pixels.shape
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, width * 3)])  # filter 0 rows
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)  # 8 bit rgb
+    data = chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows.tobytes())) + chunk(b'IEND', b'')
+    return base64.b64encode(b'\x89PNG\r\n\x1a\n' + data).decode()
 
 
 if __name__ == '__main__':
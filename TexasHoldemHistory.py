@@ -0,0 +1,182 @@
+import numpy as np
+import os
+from TexasHoldem import Card, Game
+
+action_kinds = ['blind', 'fold', 'check', 'call', 'raise']
+
+
+def record_dtype(max_players=9, max_actions=16):  # one hand; card ids and seats are -1 where there are none
+    action = np.dtype([('seat', np.int8), ('kind', np.int8), ('amount', np.int64)])  # kind indexes action_kinds
+    return np.dtype([('hand', np.int64), ('n_players', np.int8), ('dealer', np.int8), ('winner', np.int8),
+                     ('deals', np.int8, (max_players, 2)), ('board', np.int8, (5,)),
+                     ('cash', np.int64, (max_players,)),  # at the start of the hand, before the blinds
+                     ('net', np.int64, (max_players,)), ('folded', np.bool_, (max_players,)), ('pot', np.int64),
+                     ('equity', np.float32, (max_players, len(Game.streets))),  # predicted win + draw / 2, or nan
+                     ('n_actions', np.int16, (len(Game.streets),)),  # actions past max_actions are not kept
+                     ('actions', action, (len(Game.streets), max_actions))])
+
+
+class HandHistory:  # every hand of a game as a fixed width record, appended to path with the last maxlen in memory
+
+    def __init__(self, path=None, maxlen=1000, max_players=9, max_actions=16):
+        self.path = path
+        self.dtype = record_dtype(max_players, max_actions)
+        self.max_players, self.max_actions = max_players, max_actions
+        self.file = None if path is None else open(path, 'ab')
+        self.ring = np.zeros(maxlen, dtype=self.dtype)
+        self.n_hands = 0  # recorded so far, including those only on disk
+        self.names = []  # player name of each seat
+        self.current = np.zeros((), dtype=self.dtype)  # the hand being played
+
+    def start_hand(self, hand, dealer, players):
+        if len(players) > self.max_players:
+            raise ValueError('More than %i players' % self.max_players)
+        self.names = [player.name for player in players]
+        current = self.current
+        current[...] = 0
+        current['hand'], current['n_players'], current['dealer'], current['winner'] = hand, len(players), dealer, -1
+        current['deals'] = current['board'] = -1
+        current['equity'] = np.nan
+        current['actions']['seat'] = -1
+        for seat, player in enumerate(players):
+            if player.deal is not None:
+                current['deals'][seat] = [card.id for card in player.deal]
+            current['cash'][seat] = player.cash
+
+    def action(self, n_table_cards, seat, kind, amount=0):
+        street = max([0, n_table_cards - 2])
+        i = self.current['n_actions'][street]
+        if i < self.max_actions:
+            self.current['actions'][street, i] = (seat, action_kinds.index(kind), amount)
+        self.current['n_actions'][street] = min([i + 1, np.iinfo(np.int16).max])
+
+    def equities(self, n_table_cards, predicted):  # predicted [win, loss, draw] of each seat (None if not in)
+        street = max([0, n_table_cards - 2])
+        for seat, result in enumerate(predicted):
+            if result is not None:
+                self.current['equity'][seat, street] = result[0] + result[2] / 2
+
+    def table_cards(self, table_cards):
+        self.current['board'][:len(table_cards)] = [card.id for card in table_cards]
+
+    def end_hand(self, pot, winner, players):
+        current = self.current
+        current['pot'], current['winner'] = pot, winner
+        for seat, player in enumerate(players):
+            current['net'][seat] = player.cash - current['cash'][seat]
+            current['folded'][seat] = player.has_folded
+        self.ring[self.n_hands % len(self.ring)] = current
+        self.n_hands += 1
+        if self.file is not None:
+            self.file.write(current.tobytes())
+
+    def extend(self, records):  # finished hands recorded elsewhere, like those of a TexasHoldemTables.Tables
+        records = np.asarray(records, dtype=self.dtype)
+        index = (self.n_hands + np.arange(len(records))) % len(self.ring)
+        self.ring[index[-len(self.ring):]] = records[-len(self.ring):]
+        self.n_hands += len(records)
+        if self.file is not None:
+            self.file.write(records.tobytes())
+
+    def recent(self, n=None):  # a copy of the last n (at most maxlen) hands, oldest first
+        n = min([len(self.ring), self.n_hands, len(self.ring) if n is None else n])
+        return self.ring[(np.arange(self.n_hands - n, self.n_hands)) % len(self.ring)]
+
+    def hand_dict(self, record):  # a record with names, Cards and action names, for reading rather than training
+        seats = range(record['n_players'])
+        streets = {}
+        for street, n_actions, actions in zip(Game.streets, record['n_actions'], record['actions']):
+            streets[street] = [(self.names[action['seat']] if action['seat'] < len(self.names) else action['seat'],
+                                action_kinds[action['kind']], int(action['amount']))
+                               for action in actions[:n_actions]]
+        return {'hand': int(record['hand']), 'dealer': int(record['dealer']), 'winner': int(record['winner']),
+                'equity': record['equity'][:len(seats)].tolist(),
+                'deals': [tuple(Card.from_id(i) for i in record['deals'][seat]) if record['deals'][seat, 0] >= 0
+                          else None for seat in seats],
+                'board': tuple(Card.from_id(i) for i in record['board'] if i >= 0),
+                'net': record['net'][:len(seats)].tolist(), 'folded': record['folded'][:len(seats)].tolist(),
+                'pot': int(record['pot']), 'actions': streets}
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def load_history(path, max_players=9, max_actions=16):  # every record in a HandHistory file, memory mapped
+    dtype = record_dtype(max_players, max_actions)
+    if not os.path.getsize(path):
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+def export_shards(records, directory, shard_size=1 << 20, max_players=9, max_actions=16):
+    # writes records (an array or the path of a HandHistory log) to directory as .npy shards of shard_size records,
+    # holding one shard in memory at a time, and returns their paths
+    if isinstance(records, str):
+        records = load_history(records, max_players, max_actions)
+    os.makedirs(directory, exist_ok=True)
+    start = len(shard_paths(directory))  # after any shards already there
+    paths = []
+    for i in range(0, len(records), shard_size):
+        paths.append(os.path.join(directory, 'hands_%06i.npy' % (start + i // shard_size)))
+        np.save(paths[-1], np.ascontiguousarray(records[i:i+shard_size]))
+    return paths
+
+
+def shard_paths(directory):
+    return sorted([os.path.join(directory, fname) for fname in os.listdir(directory)
+                   if fname.startswith('hands_') and fname.endswith('.npy')])
+
+
+class HandDataset:  # the shards written by export_shards as one array of records, memory mapped
+
+    def __init__(self, directory):
+        self.shards = [np.load(path, mmap_mode='r') for path in shard_paths(directory)]
+        self.starts = np.cumsum([0] + [len(shard) for shard in self.shards])
+        self.dtype = self.shards[0].dtype if self.shards else record_dtype()
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def __getitem__(self, index):  # a record for an int, or an array read from just the shards a slice covers
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self[np.arange(start, stop, step)]
+            parts = []
+            for i in range(np.searchsorted(self.starts, start, 'right') - 1, len(self.shards)):
+                if self.starts[i] >= stop:
+                    break
+                parts.append(self.shards[i][max([0, start - self.starts[i]]):stop - self.starts[i]])
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=self.dtype)
+        if isinstance(index, (int, np.integer)):
+            index = index + len(self) if index < 0 else index
+            if not 0 <= index < len(self):
+                raise IndexError('Hand index out of range')
+            i = np.searchsorted(self.starts, index, 'right') - 1
+            return self.shards[i][index - self.starts[i]]
+        index = np.asarray(index)  # an array of indices, read shard by shard
+        index = np.where(index < 0, index + len(self), index)
+        shard = np.searchsorted(self.starts, index, 'right') - 1
+        records = np.zeros(len(index), dtype=self.dtype)
+        for i in np.unique(shard):
+            records[shard == i] = self.shards[i][index[shard == i] - self.starts[i]]
+        return records
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Export a HandHistory log as memory mappable .npy shards')
+    parser.add_argument('path', help='HandHistory log')
+    parser.add_argument('directory', help='where to write the shards')
+    parser.add_argument('--shard-size', type=int, default=1 << 20, help='hands per shard')
+    parser.add_argument('--max-players', type=int, default=9)
+    parser.add_argument('--max-actions', type=int, default=16)
+    args = parser.parse_args()
+    for shard_path in export_shards(args.path, args.directory, args.shard_size, args.max_players, args.max_actions):
+        print(shard_path)
@@ -0,0 +1,162 @@
+import numpy as np
+import re
+from TexasHoldem import Deck, cards_to_mask, mask_to_ids, sample_cards, make_rng, count_runouts, \
+    enumerate_runouts, get_evaluator
+
+number_chars = '23456789TJQKA'  # index + 2 is the card number
+suit_chars = 'cdhs'  # in the order of card ids
+combo_re = re.compile(r'^([2-9TJQKA])([cdhs])([2-9TJQKA])([cdhs])$')
+hand_re = re.compile(r'^([2-9TJQKA])([2-9TJQKA])([so]?)(\+?)$')
+span_re = re.compile(r'^([2-9TJQKA])([2-9TJQKA])([so]?)-([2-9TJQKA])([2-9TJQKA])([so]?)$')
+
+
+class Range:  # weighted two card combos from standard notation, like 'QQ+, AKs, T9s:0.5, 22-55, A2s+, KsQs'
+
+    def __init__(self, text=''):
+        self.weights = {}  # (low id, high id) to weight, a later part of the text overriding an earlier one
+        for part in text.split(','):
+            part = part.strip()
+            if part:
+                hands, _, weight = part.partition(':')
+                try:
+                    weight = float(weight) if weight else 1.
+                except ValueError:
+                    raise ValueError('Bad range weight %r' % part)
+                for combo in self.parse(hands.strip()):
+                    self.weights[combo] = weight
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __repr__(self):
+        return 'Range(%i combos)' % len(self)
+
+    @classmethod
+    def from_deal(cls, deal):
+        this_range = cls()
+        this_range.weights[tuple(sorted([card.id for card in deal]))] = 1.
+        return this_range
+
+    @staticmethod
+    def parse(hands):  # the (low id, high id) combos of one part of a range
+        match = combo_re.match(hands)
+        if match:
+            ids = [4 * number_chars.index(match.group(i)) + suit_chars.index(match.group(i + 1)) for i in (1, 3)]
+            if ids[0] == ids[1]:
+                raise ValueError('Bad range %r' % hands)
+            return [tuple(sorted(ids))]
+        match = hand_re.match(hands)
+        if match:
+            high, low = number_chars.index(match.group(1)), number_chars.index(match.group(2))
+            kind, plus = match.group(3), match.group(4)
+            if high < low or (high == low and kind):
+                raise ValueError('Bad range %r' % hands)
+            if not plus:
+                lows = [low]
+            elif high == low:  # QQ+ is every pair from QQ up
+                lows = list(range(low, len(number_chars)))
+            else:  # A2s+ is every kicker from 2 up to K
+                lows = list(range(low, high))
+            return [combo for this_low in lows for combo in
+                    hand_combos(this_low if high == low else high, this_low, kind)]
+        match = span_re.match(hands)
+        if match:
+            high0, low0, kind0, high1, low1, kind1 = match.groups()
+            high0, low0, high1, low1 = [number_chars.index(c) for c in (high0, low0, high1, low1)]
+            if kind0 != kind1 or (high0 == low0) != (high1 == low1) or (high0 != low0 and high0 != high1) or \
+                    high0 < low0 or high1 < low1:
+                raise ValueError('Bad range %r' % hands)
+            if high0 == low0:  # 22-55 is every pair in between
+                return [combo for number in range(min(low0, low1), max(low0, low1) + 1)
+                        for combo in hand_combos(number, number, kind0)]
+            return [combo for low in range(min(low0, low1), max(low0, low1) + 1)  # KTs-K7s
+                    for combo in hand_combos(high0, low, kind0)]
+        raise ValueError('Bad range %r' % hands)
+
+    def combos(self, dead_mask=0):  # (n, 2) ids and (n,) weights of the combos without any dead card
+        combos = [(combo, weight) for combo, weight in self.weights.items()
+                  if weight > 0 and not dead_mask & (1 << combo[0] | 1 << combo[1])]
+        return (np.array([combo for combo, _ in combos], dtype=np.int64).reshape(len(combos), 2),
+                np.array([weight for _, weight in combos], dtype=float))
+
+
+def hand_combos(high, low, kind):  # combos of two numbers (indices into number_chars), 's', 'o' or '' for both
+    combos = []
+    for suit0 in range(4):
+        for suit1 in range(4):
+            if (high == low and suit0 >= suit1) or (kind == 's' and suit0 != suit1) or \
+                    (kind == 'o' and suit0 == suit1):
+                continue
+            combos.append(tuple(sorted([4 * high + suit0, 4 * low + suit1])))
+    return combos
+
+
+def range_equity(deal, other_range, table_cards=(), dead_cards=(), n_runouts=500, rng=None, return_info=False,
+                 batch=100000):
+    # [win, loss, draw] of deal (two cards or a Range) against one deal from other_range, like Deck.score_holdem;
+    # combo pairs are weighted by the product of their weights and any pair sharing a card with each other, the
+    # table, dead_cards or a runout is left out; every runout is enumerated if there are at most n_runouts,
+    # otherwise n_runouts are sampled
+    table_cards = tuple(table_cards)
+    dead_mask = cards_to_mask(table_cards) | cards_to_mask(dead_cards)
+    this_range = deal if isinstance(deal, Range) else Range.from_deal(deal)
+    these, these_weights = this_range.combos(dead_mask)
+    others, other_weights = other_range.combos(dead_mask)
+    if not len(these) or not len(others):
+        raise ValueError('No combos left')
+    ids = mask_to_ids(Deck.full_mask & ~dead_mask)
+    n_table = Deck.hand_n - len(table_cards)
+    if count_runouts(len(ids), n_table, 0) <= n_runouts:
+        runouts, method = enumerate_runouts(ids, n_table, 0), 'exact'
+    else:
+        runouts, method = sample_cards(ids, n_table, n_runouts, make_rng(rng)), 'mc'
+    size = len(runouts)
+    boards = np.hstack([np.tile([card.id for card in table_cards], (size, 1)).astype(np.int64), runouts])
+    runout_masks = (np.int64(1) << runouts).sum(axis=1)
+    this_ranks, these_masks = rank_combos(these, boards, batch), (np.int64(1) << these).sum(axis=1)
+    other_ranks, other_masks = rank_combos(others, boards, batch), (np.int64(1) << others).sum(axis=1)
+    these_weights = these_weights[:, None] * (these_masks[:, None] & runout_masks[None, :] == 0)  # (n, size)
+    other_weights = other_weights[:, None] * (other_masks[:, None] & runout_masks[None, :] == 0)
+    conflicts = np.nonzero(these_masks[:, None] & other_masks[None, :])  # the few combo pairs sharing a card
+
+    # for each runout, the weight of the other combos below and up to each combo's rank from the other combos
+    # sorted by rank, then taking back the combos that share one of its cards
+    order = np.argsort(other_ranks, axis=0, kind='stable')
+    sorted_ranks = np.take_along_axis(other_ranks, order, axis=0)
+    cumulative = np.vstack([np.zeros((1, size)), np.cumsum(np.take_along_axis(other_weights, order, axis=0), axis=0)])
+    offsets = np.arange(size, dtype=np.int64) << 32  # searches every runout's column at once
+    keys = (sorted_ranks + offsets).T.ravel()
+    queries, starts = (this_ranks + offsets).ravel(), np.arange(size) * len(others)
+    below = np.searchsorted(keys, queries, 'left').reshape(this_ranks.shape) - starts
+    up_to = np.searchsorted(keys, queries, 'right').reshape(this_ranks.shape) - starts
+    columns = np.arange(size)
+    win = cumulative[below, columns]
+    draw = cumulative[up_to, columns] - win
+    loss = cumulative[-1] - win - draw
+    step = max([1, batch // size])
+    for i in range(0, len(conflicts[0]), step):  # conflicts come sorted by this combo
+        these_conflicts, other_conflicts = conflicts[0][i:i+step], conflicts[1][i:i+step]
+        rows, starts = np.unique(these_conflicts, return_index=True)
+        signs = np.sign(this_ranks[these_conflicts] - other_ranks[other_conflicts])
+        for this_result, sign in [(win, 1), (loss, -1), (draw, 0)]:
+            this_result[rows] -= np.add.reduceat(other_weights[other_conflicts] * (signs == sign), starts, axis=0)
+    result = np.array([(these_weights * this_result).sum() for this_result in (win, loss, draw)])
+    if not result.sum():
+        raise ValueError('No combos left')
+    result = result / result.sum()
+    info = {'method': method, 'n': size, 'combos': (len(these), len(others))}
+    return (result, info) if return_info else result
+
+
+def rank_combos(combos, boards, batch=100000):  # (n, size) ranks of every combo with every board, -1 if they overlap
+    size = len(boards)
+    ranks = np.full((len(combos), size), -1, dtype=np.int64)
+    board_masks = (np.int64(1) << boards).sum(axis=1)
+    step = max([1, batch // size])
+    for i in range(0, len(combos), step):
+        these = combos[i:i+step]
+        valid = (np.int64(1) << these).sum(axis=1)[:, None] & board_masks[None, :] == 0
+        cards = np.concatenate([np.broadcast_to(these[:, None, :], (len(these), size, 2)),
+                                np.broadcast_to(boards[None, :, :], (len(these),) + boards.shape)], axis=2)
+        ranks[i:i+step][valid] = get_evaluator().rank_batch(cards[valid])
+    return ranks
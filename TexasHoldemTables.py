@@ -0,0 +1,251 @@
+import numpy as np
+from importlib import import_module
+from TexasHoldem import Deck, get_evaluator, get_preflop_table, spawn_rngs, stats
+from TexasHoldemHistory import action_kinds, record_dtype
+
+responses = ['fold', 'call', 'bet']  # what a batch ai answers, by index, like TexasHoldemAI.make_decision
+fold, call, bet = range(len(responses))
+
+
+class Tables:
+    # n_tables headless games of n_seats ais played in lockstep, every table's state in arrays: each step asks the
+    # batch ai for the decisions of every table waiting on one at once, from their sampled equities; like Game, there
+    # are no side pots, but ties split the pot and the blinds stay the same
+
+    def __init__(self, n_tables, n_seats=6, cash=500, small_blind=1, big_blind=5, ai=None, seed=None,
+                 n_runouts=200, history=None, max_actions=16):
+        if not 2 <= n_seats <= (Deck.N - Deck.hand_n) // Deck.deal_n:
+            raise ValueError('Bad number of seats %i' % n_seats)
+        if history is not None and n_seats > history.max_players:
+            raise ValueError('More than %i players' % history.max_players)
+        self.n_tables, self.n_seats = n_tables, n_seats
+        self.small_blind, self.big_blind = small_blind, big_blind
+        self.deal_rng, self.mc_rng, ai_rng = spawn_rngs(seed, 3)
+        if ai is None:
+            ai = import_module('AI.DefaultTexasHoldemAI').BatchTexasHoldemAI(n_tables, n_seats, rng=ai_rng)
+        self.ai = ai  # make_decisions(tables, rows, seats, predicted) gives (responses, amounts) arrays
+        self.n_runouts = n_runouts  # per decision, to sample its equity
+        self.history = history  # a TexasHoldemHistory.HandHistory every finished hand is added to
+        shape = (n_tables, n_seats)
+        self.cash = np.full(shape, cash, dtype=np.int64)
+        self.bet = np.zeros(shape, dtype=np.int64)  # this street
+        self.in_hand = np.zeros(shape, dtype=bool)  # dealt this hand
+        self.folded = np.zeros(shape, dtype=bool)
+        self.acted = np.zeros(shape, dtype=bool)  # this street, since the last raise
+        self.deals = np.full(shape + (Deck.deal_n,), -1, dtype=np.int64)
+        self.boards = np.full((n_tables, Deck.hand_n), -1, dtype=np.int64)  # dealt with the deals, n_board shown
+        self.n_board = np.zeros(n_tables, dtype=np.int64)
+        self.pot = np.zeros(n_tables, dtype=np.int64)
+        self.current_bet = np.zeros(n_tables, dtype=np.int64)
+        self.dealer = np.zeros(n_tables, dtype=np.int64)
+        self.turn = np.zeros(n_tables, dtype=np.int64)
+        self.hands = np.zeros(n_tables, dtype=np.int64)  # finished
+        self.playing = np.zeros(n_tables, dtype=bool)  # a hand is in progress
+        self.n_hands = 0  # started over every table, numbering the records
+        dtype = record_dtype(max([9, n_seats]), max_actions) if history is None else history.dtype
+        self.records = np.zeros(n_tables, dtype=dtype)  # the hand in progress at each table
+
+    def run(self, n_hands=None):
+        # plays until every table has played n_hands more hands or has only one player with cash left, starting the
+        # next hand of each table as soon as its last one is over; returns the number of hands played
+        start = self.hands.sum()
+        last = None if n_hands is None else self.hands + n_hands
+        while True:
+            waiting = ~self.playing & ((self.cash > 0).sum(axis=1) > 1)
+            if last is not None:
+                waiting &= self.hands < last
+            if waiting.any():
+                self.start_hands(np.flatnonzero(waiting))
+            rows = np.flatnonzero(self.playing)
+            if not len(rows):
+                return int(self.hands.sum() - start)
+            self.step(rows)
+
+    def step(self, rows):  # one decision at each of the tables rows
+        seats = self.turn[rows]
+        with stats.section('tables equity'):
+            predicted = self.predict(rows, seats)
+        with stats.section('tables ai'):
+            these_responses, amounts = self.ai.make_decisions(self, rows, seats, predicted)
+        self.apply(rows, seats, np.asarray(these_responses), np.asarray(amounts, dtype=np.int64), predicted)
+        self.settle(rows)
+
+    def start_hands(self, rows):
+        n, records = len(rows), self.records
+        self.in_hand[rows] = self.cash[rows] > 0
+        self.folded[rows] = self.acted[rows] = False
+        self.bet[rows] = self.pot[rows] = self.n_board[rows] = 0
+        cards = np.argsort(self.deal_rng.random((n, Deck.N)), axis=1)  # a shuffled deck for each table
+        deals = cards[:, :Deck.deal_n * self.n_seats].reshape(n, self.n_seats, Deck.deal_n)
+        self.deals[rows] = np.where(self.in_hand[rows][:, :, None], deals, -1)
+        self.boards[rows] = cards[:, Deck.deal_n * self.n_seats:Deck.deal_n * self.n_seats + Deck.hand_n]
+        records[rows] = 0
+        records['hand'][rows] = self.n_hands + 1 + np.arange(n)
+        self.n_hands += n
+        records['n_players'][rows], records['dealer'][rows] = self.n_seats, self.dealer[rows]
+        records['winner'][rows] = -1
+        records['deals'][rows] = records['board'][rows] = -1
+        records['deals'][rows, :self.n_seats] = self.deals[rows]
+        records['cash'][rows, :self.n_seats] = self.cash[rows]
+        records['equity'][rows] = np.nan
+        records['actions']['seat'][rows] = -1
+        small = self.next_seat(self.dealer[rows], self.in_hand[rows])
+        big = self.next_seat(small, self.in_hand[rows])
+        for seats, blind in [(small, self.small_blind), (big, self.big_blind)]:
+            amounts = np.minimum(self.cash[rows, seats], blind)
+            self.put_in(rows, seats, amounts)
+            self.record_actions(rows, seats, np.full(n, action_kinds.index('blind')), amounts)
+        self.current_bet[rows] = self.bet[rows].max(axis=1)
+        self.turn[rows] = big
+        self.playing[rows] = True
+        self.settle(rows)
+
+    def next_seat(self, start, eligible):  # the first eligible seat after start in each row of eligible, -1 if none
+        order = (start[:, None] + 1 + np.arange(self.n_seats)) % self.n_seats
+        these = np.take_along_axis(eligible, order, axis=1)
+        return np.where(these.any(axis=1), order[np.arange(len(start)), these.argmax(axis=1)], -1)
+
+    def put_in(self, rows, seats, amounts):
+        self.cash[rows, seats] -= amounts
+        self.bet[rows, seats] += amounts
+        self.pot[rows] += amounts
+
+    def record_actions(self, rows, seats, kinds, amounts):  # kinds index action_kinds
+        street = np.maximum(0, self.n_board[rows] - 2)
+        actions, n_actions = self.records['actions'], self.records['n_actions']
+        i = n_actions[rows, street]
+        kept = i < actions.shape[2]  # actions past max_actions are not kept
+        for field, values in [('seat', seats), ('kind', kinds), ('amount', amounts)]:
+            actions[field][rows[kept], street[kept], i[kept]] = values[kept]
+        n_actions[rows, street] = np.minimum(i + 1, np.iinfo(n_actions.dtype).max)
+
+    def predict(self, rows, seats, batch=100000):
+        # (n, 3) [win, loss, draw] of each seat's deal against as many random deals as there are other deals still
+        # in, from the preflop table if there is one, else sampled in batches of about batch runouts
+        n_other = (self.in_hand[rows] & ~self.folded[rows]).sum(axis=1) - 1
+        deals, n_board = self.deals[rows, seats], self.n_board[rows]
+        predicted = np.zeros((len(rows), 3))
+        sampled = np.ones(len(rows), dtype=bool)
+        preflop_table = get_preflop_table()
+        if preflop_table:
+            these = (n_board == 0) & (n_other <= preflop_table.counts.shape[1])
+            counts = np.asarray(preflop_table.counts[hand_classes(deals[these]), n_other[these] - 1], dtype=float)
+            predicted[these] = counts / counts.sum(axis=1, keepdims=True)
+            sampled &= ~these
+        step = max([1, batch // self.n_runouts])
+        for k, this_n_board in set(zip(n_other[sampled], n_board[sampled])):
+            these = np.flatnonzero(sampled & (n_other == k) & (n_board == this_n_board))
+            for i in range(0, len(these), step):
+                part = these[i:i+step]
+                predicted[part] = sample_equity(deals[part], self.boards[rows[part], :this_n_board], k, self.n_runouts,
+                                                self.mc_rng)
+        return predicted
+
+    def apply(self, rows, seats, these_responses, amounts, predicted):
+        # like Game.get_ai_response and apply_bet: calls put in what is owed, bets are capped at the cash left and a
+        # bet too low to call (without going all in) folds
+        cash, bets, current_bet = self.cash[rows, seats], self.bet[rows, seats], self.current_bet[rows]
+        amounts = np.clip(np.where(these_responses == call, current_bet - bets, amounts), 0, cash)
+        folds = (these_responses == fold) | ((amounts + bets < current_bet) & (amounts < cash))
+        amounts = np.where(folds, 0, amounts)
+        raises = ~folds & (amounts + bets > current_bet)
+        kinds = np.select([folds, raises, amounts == 0],
+                          [action_kinds.index(kind) for kind in ['fold', 'raise', 'check']], action_kinds.index('call'))
+        street = np.maximum(0, self.n_board[rows] - 2)
+        equity = self.records['equity']
+        first = np.isnan(equity[rows, seats, street])  # the first decision of each seat on each street
+        equity[rows[first], seats[first], street[first]] = predicted[first, 0] + predicted[first, 2] / 2
+        self.record_actions(rows, seats, kinds, amounts)
+        self.put_in(rows, seats, amounts)
+        self.folded[rows[folds], seats[folds]] = True
+        self.current_bet[rows] = np.maximum(current_bet, self.bet[rows, seats])
+        self.acted[rows[raises]] = False
+        self.acted[rows, seats] = True
+
+    def settle(self, rows):
+        # after the blinds or an action at each of rows: the next seat up, or the next street and, if fewer than two
+        # can still bet, the ones after it, or the end of the hand
+        while len(rows):
+            live = self.in_hand[rows] & ~self.folded[rows]
+            won = live.sum(axis=1) == 1  # everyone else folded
+            if won.any():
+                self.end_hands(rows[won], live[won])
+            rows, live = rows[~won], live[~won]
+            active = live & (self.cash[rows] > 0)
+            betting = (active.sum(axis=1) >= 2)[:, None]
+            needs = active & ((self.bet[rows] < self.current_bet[rows, None]) | (~self.acted[rows] & betting))
+            up = needs.any(axis=1)
+            self.turn[rows[up]] = self.next_seat(self.turn[rows[up]], needs[up])
+            rows = rows[~up]  # every street over
+            river = self.n_board[rows] == Deck.hand_n
+            if river.any():
+                self.showdown(rows[river])
+            rows = rows[~river]
+            self.n_board[rows] = np.where(self.n_board[rows] == 0, 3, self.n_board[rows] + 1)
+            self.bet[rows] = self.current_bet[rows] = 0
+            self.acted[rows] = False
+            self.turn[rows] = self.dealer[rows]  # the first up is the first after the dealer
+
+    def showdown(self, rows):
+        live = self.in_hand[rows] & ~self.folded[rows]
+        hands = np.concatenate([self.deals[rows], np.broadcast_to(self.boards[rows][:, None, :],
+                                                                  (len(rows), self.n_seats, Deck.hand_n))], axis=2)
+        ranks = np.full(live.shape, -1, dtype=np.int64)
+        ranks[live] = get_evaluator().rank_batch(hands[live])
+        self.end_hands(rows, ranks == ranks.max(axis=1, keepdims=True))
+
+    def end_hands(self, rows, winners):  # winners (rows, n_seats) split each pot, the first one getting any remainder
+        n_winners = winners.sum(axis=1)
+        shares = self.pot[rows] // n_winners
+        first = winners.argmax(axis=1)
+        self.cash[rows] += winners * shares[:, None]
+        self.cash[rows, first] += self.pot[rows] - shares * n_winners
+        records = self.records
+        records['pot'][rows], records['winner'][rows] = self.pot[rows], first
+        records['board'][rows] = np.where(np.arange(Deck.hand_n) < self.n_board[rows, None], self.boards[rows], -1)
+        records['net'][rows, :self.n_seats] = self.cash[rows] - records['cash'][rows, :self.n_seats]
+        records['folded'][rows, :self.n_seats] = self.folded[rows] & self.in_hand[rows]
+        if self.history is not None:
+            self.history.extend(records[rows])
+        if stats.enabled:
+            stats.count('hands', len(rows))
+        self.hands[rows] += 1
+        self.playing[rows] = False
+        self.dealer[rows] = self.next_seat(self.dealer[rows], self.cash[rows] > 0)
+
+
+def hand_classes(deals):  # PreflopTable.hand_class of each of (n, 2) deal ids
+    numbers = deals // 4
+    high, low = numbers.max(axis=1), numbers.min(axis=1)
+    return np.where(deals[:, 0] % 4 == deals[:, 1] % 4, high * Deck.n_names + low, low * Deck.n_names + high)
+
+
+def sample_equity(deals, boards, n_other, n_runouts, rng):
+    # (n, 3) [win, loss, draw] fractions of (n, 2) deal ids against n_other random deals, over n_runouts runouts of
+    # the (n, n_board) boards shown so far, drawing each runout's cards without replacement
+    (n, n_board), rows = boards.shape, np.arange(len(deals))
+    n_table, n_unseen = Deck.hand_n - n_board, Deck.N - Deck.deal_n - n_board
+    dead = np.zeros((n, Deck.N), dtype=bool)
+    dead[rows[:, None], deals] = dead[rows[:, None], boards] = True
+    unseen = np.argsort(dead, axis=1, kind='stable')[:, :n_unseen]  # each row's unseen ids
+    drawn = unseen[rows.repeat(n_runouts)[:, None],
+                   partial_shuffle(n_unseen, n_table + Deck.deal_n * n_other, n * n_runouts, rng)]
+    board = np.hstack([boards.repeat(n_runouts, axis=0), drawn[:, :n_table]])
+    evaluator = get_evaluator()
+    this = evaluator.rank_batch(np.hstack([deals.repeat(n_runouts, axis=0), board]))
+    best = np.full(len(board), -1, dtype=this.dtype)
+    for j in range(n_table, drawn.shape[1], Deck.deal_n):
+        best = np.maximum(best, evaluator.rank_batch(np.hstack([drawn[:, j:j+Deck.deal_n], board])))
+    signs = np.sign(this.astype(np.int64) - best).reshape(n, n_runouts)
+    return np.stack([(signs > 0).mean(axis=1), (signs < 0).mean(axis=1), (signs == 0).mean(axis=1)], axis=1)
+
+
+def partial_shuffle(n, k, size, rng):  # (size, k) positions in range(n), each row distinct, from k fisher-yates swaps
+    positions = np.broadcast_to(np.arange(n, dtype=np.int8), (size, n)).copy()
+    rows, swaps = np.arange(size), rng.random((size, k))
+    for i in range(k):
+        j = i + (swaps[:, i] * (n - i)).astype(np.int64)
+        these = positions[:, i].copy()
+        positions[:, i] = positions[rows, j]
+        positions[rows, j] = these
+    return positions[:, :k]
@@ -0,0 +1,120 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib import import_module
+from TexasHoldem import Player, Game, spawn_rngs
+
+ai_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AI')
+
+
+def find_ais(directory=ai_dir):  # module names under AI/ that define a TexasHoldemAI class
+    names = []
+    for fname in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(fname)
+        if ext == '.py' and not name.startswith('_') and hasattr(import_module('AI.%s' % name), 'TexasHoldemAI'):
+            names.append(name)
+    return names
+
+
+def schedule(ai_names, n_matches, n_seats, seed=None):
+    # lineups of n_seats ais, each lineup played from every seat rotation in turn, with one seed per match
+    rng = np.random.default_rng(seed)
+    seeds = np.random.SeedSequence(seed).spawn(n_matches)
+    matches = []
+    while len(matches) < n_matches:
+        if len(ai_names) >= n_seats:
+            lineup = [str(ai_name) for ai_name in rng.choice(ai_names, n_seats, replace=False)]
+        else:
+            lineup = [ai_names[i % len(ai_names)] for i in range(n_seats)]
+        for rotation in range(n_seats):
+            if len(matches) < n_matches:
+                matches.append((lineup[rotation:] + lineup[:rotation], seeds[len(matches)]))
+    return matches
+
+
+def play_match(lineup, seed, n_hands=100, cash=500, small_blind=1, big_blind=5):
+    # plays one headless game and returns (ai, seat, net cash, hands played) for every seat
+    rngs = spawn_rngs(seed, len(lineup) + 1)
+    names = ['%s %i' % (ai_name, seat) for seat, ai_name in enumerate(lineup)]
+    players = [Player(ai=import_module('AI.%s' % ai_name).TexasHoldemAI(name, cash, names, rng=rng),
+                      name=name, cash=cash) for ai_name, name, rng in zip(lineup, names, rngs)]
+    game = Game(players, small_blind=small_blind, big_blind=big_blind, seed=rngs[-1], verbose=False)
+    hands = game.run(n_hands=n_hands)
+    return [(ai_name, seat, player.cash - cash, hands) for seat, (ai_name, player) in enumerate(zip(lineup, players))]
+
+
+class Leaderboard:
+
+    def __init__(self):
+        self.results = {}  # ai name to matches, hands, net cash and match wins
+        self.seats = {}  # (ai name, seat) to net cash
+
+    def update(self, match):
+        best = max([net for _, _, net, _ in match])
+        for ai_name in set([ai_name for ai_name, _, _, _ in match]):
+            result = self.results.setdefault(ai_name, {'matches': 0, 'hands': 0, 'net': 0, 'wins': 0})
+            result['matches'] += 1
+            result['wins'] += any([net == best for this_ai_name, _, net, _ in match if this_ai_name == ai_name])
+        for ai_name, seat, net, hands in match:
+            self.results[ai_name]['hands'] += hands
+            self.results[ai_name]['net'] += net
+            self.seats[(ai_name, seat)] = self.seats.get((ai_name, seat), 0) + net
+
+    def ranking(self):
+        return sorted(self.results.items(), key=lambda item: item[1]['net'] / max([1, item[1]['hands']]),
+                      reverse=True)
+
+    def __str__(self):
+        lines = ['%-24s %8s %10s %10s %8s %12s' % ('ai', 'matches', 'hands', 'net', 'wins', 'net / hand')]
+        for ai_name, result in self.ranking():
+            lines.append('%-24s %8i %10i %10i %8i %12.3f' % (ai_name, result['matches'], result['hands'],
+                                                            result['net'], result['wins'],
+                                                            result['net'] / max([1, result['hands']])))
+        return '\n'.join(lines)
+
+
+def run_tournament(ai_names=None, n_matches=100, n_seats=6, n_hands=100, cash=500, small_blind=1, big_blind=5,
+                   workers=None, seed=None, callback=None):
+    # plays the scheduled matches on a process pool of workers (in this process if workers is 0), merging each
+    # result into the leaderboard as it arrives and passing it to callback(leaderboard, n_done, n_matches)
+    ai_names = find_ais() if ai_names is None else list(ai_names)
+    matches = schedule(ai_names, n_matches, n_seats, seed)
+    leaderboard = Leaderboard()
+    kwargs = dict(n_hands=n_hands, cash=cash, small_blind=small_blind, big_blind=big_blind)
+    if workers == 0:
+        results = (play_match(lineup, match_seed, **kwargs) for lineup, match_seed in matches)
+        for i, result in enumerate(results):
+            leaderboard.update(result)
+            if callback is not None:
+                callback(leaderboard, i + 1, len(matches))
+        return leaderboard
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_match, lineup, match_seed, **kwargs) for lineup, match_seed in matches]
+        for i, future in enumerate(as_completed(futures)):
+            leaderboard.update(future.result())
+            if callback is not None:
+                callback(leaderboard, i + 1, len(matches))
+    return leaderboard
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Rank the TexasHoldemAI modules in AI/ against each other')
+    parser.add_argument('ais', nargs='*', help='ai module names (default: every module in AI/)')
+    parser.add_argument('--matches', type=int, default=100, help='number of games to play')
+    parser.add_argument('--seats', type=int, default=6, help='players per game')
+    parser.add_argument('--hands', type=int, default=100, help='hands per game at most')
+    parser.add_argument('--cash', type=int, default=500, help='starting cash per player')
+    parser.add_argument('--small-blind', type=int, default=1)
+    parser.add_argument('--big-blind', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per core, 0: no pool)')
+    parser.add_argument('--seed', type=int, default=None, help='seed for the schedule and every game')
+    args = parser.parse_args()
+
+    def progress(leaderboard, n_done, n_matches):
+        if n_done % max([1, n_matches // 10]) == 0 or n_done == n_matches:
+            print('%i / %i games\n%s\n' % (n_done, n_matches, leaderboard))
+
+    run_tournament(args.ais or None, n_matches=args.matches, n_seats=args.seats, n_hands=args.hands,
+                   cash=args.cash, small_blind=args.small_blind, big_blind=args.big_blind, workers=args.workers,
+                   seed=args.seed, callback=progress)
@@ -1,6 +1,43 @@
+import json
 import numpy as np
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from importlib import import_module
-from TexasHoldem import Card, Hand, Deck, Player, Game
+from itertools import combinations
+from TexasHoldem import (Card, Hand, Deck, Player, Game, PreflopTable, EquityCache, EquitySession, TableEquity,
+                         EventQueue, score_hands, cards_to_mask, mask_to_cards, spawn_rngs, stats)
+from TexasHoldemTournament import find_ais, schedule, run_tournament
+from TexasHoldemRange import Range, range_equity
+from TexasHoldemBenchmark import run_benchmarks, compare
+from TexasHoldemHistory import HandHistory, HandDataset, load_history, export_shards
+from TexasHoldemTables import Tables, sample_equity
+
+
+class LazyExecutor:  # an executor running each call only once its result is asked for, keeping the rngs it got
+
+    def __init__(self):
+        self.submitted = self.run = 0
+        self.rngs = []
+
+    def submit(self, func, *args):
+        self.submitted += 1
+        self.rngs += [arg for arg in args if isinstance(arg, np.random.Generator)]
+        return LazyFuture(self, func, args)
+
+
+class LazyFuture:
+
+    def __init__(self, executor, func, args):
+        self.executor, self.func, self.args = executor, func, args
+
+    def result(self):
+        self.executor.run += 1
+        return self.func(*self.args)
+
+    def cancel(self):
+        return True
 
 
 def test_game():
@@ -14,6 +51,152 @@ def test_game():
     game.new_game()
 
 
+def test_run():
+    cash, n_players = 200, 3
+    names = Player.names[:n_players]
+    players = [Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(names[i], cash, names), name=names[i],
+                      cash=cash) for i in range(n_players)]
+    game = Game(players)
+    assert game.run(n_hands=4) == 4 or game.state == 'game over'
+    assert game.state in ['hand over', 'game over'] and sum([player.cash for player in players]) == cash * n_players
+    game.run(until=lambda this_game: this_game.hands >= 6)
+    assert game.hands == 6 or game.state == 'game over'
+    game.run()
+    assert game.state == 'game over' and sorted([player.cash for player in players])[-2] == 0
+
+
+def test_history():
+    cash, n_players = 100, 4
+    names = Player.names[:n_players]
+    players = [Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(names[i], cash, names, rng=i),
+                      name=names[i], cash=cash) for i in range(n_players)]
+    path = os.path.join(tempfile.mkdtemp(), 'history.bin')
+    history = HandHistory(path, maxlen=5)
+    game = Game(players, seed=0, history=history)
+    hands = game.run(n_hands=12)
+    history.close()
+    records = load_history(path)
+    assert len(records) == history.n_hands == hands and players[0].ai.history is history
+    assert history.recent().tobytes() == records[-5:].tobytes() and len(history.recent(2)) == 2
+    assert (records['net'].sum(axis=1) == 0).all() and (records['n_actions'][:, 0] >= 2).all()
+    assert (records['hand'] == np.arange(1, hands + 1)).all()
+    last = history.hand_dict(records[-1])
+    assert last['deals'][0] == players[0].deal and last['actions']['pre-flop'][0][1] == 'blind'
+    assert [player.cash for player in players] == (records['cash'][-1] + records['net'][-1])[:n_players].tolist()
+    assert (records['equity'][:, :n_players, 0] >= 0).all() and np.isnan(records['equity'][:, n_players:]).all()
+    directory = tempfile.mkdtemp()
+    assert len(export_shards(path, directory, shard_size=5)) == (hands + 4) // 5
+    dataset = HandDataset(directory)
+    assert len(dataset) == hands and dataset[3:hands - 1].tobytes() == records[3:hands - 1].tobytes()
+    assert dataset[-1].tobytes() == records[-1].tobytes() and dataset[[7, 1]].tobytes() == records[[7, 1]].tobytes()
+
+
+def test_events():
+    cash, n_players = 1000, 4
+    names = Player.names[:n_players]
+    players = [Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(names[i], cash, names, rng=i),
+                      name=names[i], cash=cash) for i in range(n_players)]
+    game, events, hands_over = Game(players, seed=0, verbose=False), EventQueue(), []
+    game.subscribe(events)
+    game.subscribe(hands_over.append, ['hand over'])
+    hands = game.run(n_hands=3)
+    kinds = [event.kind for event in events.drain()]
+    assert kinds[0] == 'deal' and kinds.count('deal') == hands == len(hands_over) and kinds.count('equity') <= 1
+    assert kinds[1:3] == ['action', 'action'] and kinds[3] == 'turn' and not len(events)
+    last = hands_over[-1]
+    assert last.table.players[last.winner].cash == players[last.winner].cash and last.table.players[0] is not players[0]
+    assert sum([player.cash for player in last.table.players]) == cash * n_players and last.text()
+    game.unsubscribe(events)
+    game.run(n_hands=1)
+    assert not len(events) and len(hands_over) == hands + 1 and list(game.subscribers) == ['hand over']
+
+
+def test_tables():
+    n_tables, n_seats, cash = 50, 4, 100
+    history = HandHistory(maxlen=1000, max_players=n_seats)
+    tables = Tables(n_tables, n_seats, cash=cash, seed=0, history=history)
+    hands = tables.run(n_hands=5)
+    assert hands == history.n_hands == tables.hands.sum() and (tables.hands <= 5).all() and not tables.playing.any()
+    assert (tables.cash.sum(axis=1) == cash * n_seats).all() and (tables.cash >= 0).all()
+    records = history.recent()
+    assert (records['net'].sum(axis=1) == 0).all() and len(np.unique(records['hand'])) == hands
+    assert (records['actions']['kind'][:, 0, :2] == 0).all() and (records['winner'] >= 0).all()
+    assert history.hand_dict(records[-1])['actions']['pre-flop'][0][1] == 'blind'
+    other = Tables(n_tables, n_seats, cash=cash, seed=0)
+    other.run(n_hands=5)
+    assert (other.cash == tables.cash).all()
+    aces = np.array([[Card('Ace', 'Spades').id, Card('Ace', 'Hearts').id]])
+    result = sample_equity(aces, np.zeros((1, 0), dtype=np.int64), 1, 20000, np.random.default_rng(0))[0]
+    assert abs(result[0] + result[2] / 2 - 0.85) < 0.02 and abs(result.sum() - 1) < 1e-9
+
+
+def test_tournament():
+    assert 'DefaultTexasHoldemAI' in find_ais()
+    matches = schedule(['a', 'b', 'c'], 7, 3, seed=0)
+    assert len(matches) == 7 and matches[1][0] == matches[0][0][1:] + matches[0][0][:1]
+    leaderboard = run_tournament(['DefaultTexasHoldemAI'], n_matches=2, n_seats=3, n_hands=5, cash=50, workers=0,
+                                 seed=0)
+    result = leaderboard.results['DefaultTexasHoldemAI']
+    assert result['matches'] == 2 and result['net'] == 0 and 0 < result['hands'] <= 30
+
+
+def test_stats():
+    names = Player.names[:3]
+    players = [Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(names[i], 100, names, rng=i),
+                      name=names[i], cash=100) for i in range(3)]
+    path = os.path.join(tempfile.mkdtemp(), 'stats.jsonl')
+    stats.reset()
+    stats.enabled, stats.path, stats.dump_every, stats.profile_sections = True, path, 0, {'ai decision'}
+    try:
+        hands = Game(players, seed=0).run(n_hands=3)
+        Deck(equity_cache=False).score_holdem((Card('Ace', 'Spades'), Card('Ace', 'Hearts')), n_other_players=3)
+    finally:
+        stats.enabled, stats.path, stats.profile_sections = False, None, set()
+    snapshot = stats.snapshot()
+    assert snapshot['counters']['hands'] == hands and snapshot['counters']['hands evaluated'] > 0
+    assert snapshot['counters']['score_holdem mc'] == 1 and snapshot['counters']['mc batches'] >= 2
+    assert snapshot['timers']['ai decision']['n'] >= 2 * hands and 'pre-flop' in snapshot['timers']
+    assert 'ai decision' in stats.profiles and snapshot['hands_per_second'] > 0
+    with open(path) as f:
+        assert [json.loads(line)['counters']['hands'] for line in f] == list(range(1, hands + 1))
+    Game(players, seed=0).run(n_hands=1)
+    assert stats.snapshot()['counters']['hands'] == hands
+    stats.reset()
+
+
+def test_benchmark():
+    results = run_benchmarks(['hand_construct', 'score_holdem_river_1', 'game_hand'], min_time=0.01, repeat=2)
+    assert sorted(results) == ['game_hand', 'hand_construct', 'score_holdem_river_1']
+    assert all([seconds > 0 for seconds in results.values()])
+    assert compare(results, {'hand_construct': results['hand_construct'] / 2}) == \
+        [('hand_construct', results['hand_construct'] / 2, results['hand_construct'], 2.)]
+
+
+def test_seed():
+    def play(seed):
+        cash, n_players = 10, 4
+        names = Player.names[:n_players]
+        rngs = spawn_rngs(seed, n_players + 1)
+        players = [Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(names[i], cash, names, rng=rngs[i]),
+                          name=names[i], cash=cash) for i in range(n_players)]
+        game = Game(players, seed=rngs[-1])
+        game.new_game()
+        return game.hands, [player.cash for player in players]
+    assert play(3) == play(3)
+    assert Deck(rng=5).random_cards(5) == Deck(rng=5).random_cards(5)
+
+
+def test_card():
+    card = Card('Ace', 'Spades')
+    assert card is Card('Ace', 'Spades') and card is pickle.loads(pickle.dumps(card))
+    assert Card(10, 'Hearts') is Card('10', 'Hearts')
+    assert Card(2, 'Spades') < Card(3, 'Clubs') < Card(3, 'Diamonds')
+    assert len(set(Card.deck)) == Deck.N and [c.id for c in Card.deck] == list(range(Deck.N))
+    deck = Deck()
+    deal = deck.random_cards(2)
+    assert len(deck) == len(deck.cards) == Deck.N - 2 and not deck.cards.intersection(deal)
+
+
 def test_deck():
     deal0 = (Card('Ace', 'Spades'), Card(9, 'Hearts'))
     deal1 = (Card(2, 'Diamonds'), Card(4, 'Clubs'))
@@ -25,9 +208,226 @@ def test_deck():
     assert hand0 > hand1
     assert hand0.get_text() == 'Full house Aces full of 9s'
     assert hand1.get_text() == 'Two pair Aces and 4s'
+    assert hand0 == Hand(hand0.cards[::-1]) and len({hand0, Hand(hand0.cards[::-1]), hand1}) == 2
+    assert not hasattr(hand0, '__dict__')
     deck.random_cards(2)
 
 
+def test_deal_table():
+    deck = Deck()
+    deals, table_cards = deck.deal_table(9)
+    cards = [card for deal in deals for card in deal] + list(table_cards)
+    assert len(deals) == 9 and len(table_cards) == Deck.hand_n and len(set(cards)) == 23 == Deck.N - len(deck)
+    assert not deck.cards.intersection(cards)
+    deck.cards = deck.cards  # reshuffles what is left
+    assert len(set(deck.random_cards(29))) == 29 and len(deck) == 0
+
+
+def test_evaluator():
+    deck = Deck()
+    for n in [5, 6, 7, 7]:
+        for _ in range(50):
+            cards = [Card.deck[i] for i in np.random.choice(Deck.N, 2 * n, replace=False)]
+            hands = [max([Hand(c) for c in combinations(these, Deck.hand_n)]) for these in (cards[:n], cards[n:])]
+            ranks = [deck.get_hand_rank(these) for these in (cards[:n], cards[n:])]
+            assert (hands[0] < hands[1]) == (ranks[0] < ranks[1]) and hands[0].score == ranks[0]
+            assert (hands[1] < hands[0]) == (ranks[1] < ranks[0])
+            assert deck.get_best_hand(cards[:n]).get_text() == hands[0].get_text()
+
+
+def test_score_hands():
+    deck = Deck()
+    cards = np.argsort(np.random.random((500, Deck.N)), axis=1)[:, :7]
+    for n in [5, 6, 7]:
+        ranks, labels = score_hands(cards[:, :n], labels=True)
+        assert ranks.shape == (500,)
+        texts = {'Three of a kind': 'Three', 'Four of a kind': 'Four', 'Straight flush': 'straight flush'}
+        for row, rank, label in zip(cards[:25, :n], ranks, labels):
+            these = [Card.deck[i] for i in row]
+            assert rank == deck.get_hand_rank(these)
+            assert texts.get(label, label) in deck.get_best_hand(these).get_text()
+
+
+def test_score_holdem():
+    aces, kings = (Card('Ace', 'Spades'), Card('Ace', 'Hearts')), (Card('King', 'Spades'), Card('King', 'Hearts'))
+    for mc_batch, tolerance in [(0, 0.2), (1000, 0.05)]:  # one runout at a time stops after a few hundred
+        deck = Deck(mc_batch=mc_batch)
+        win, loss, draw = deck.score_holdem(aces)
+        assert abs(win - 0.85) < tolerance and abs(win + loss + draw - 1) < 1e-9
+        assert abs(deck.score_holdem(aces, other_deals=[kings])[0] - 0.82) < tolerance
+    assert Deck().mc_batched(aces, (), mask_to_cards(Deck.full_mask & ~cards_to_mask(aces)), n=8).sum() == 1000
+    executor = LazyExecutor()
+    deck = Deck(mc_jobs=4, mc_executor=executor, mc_rng=0, equity_cache=False, preflop_table=False)
+    result, info = deck.score_holdem(aces, return_info=True)
+    assert info['method'] == 'mc' and info['n'] == 1000 * executor.run and abs(result[0] - 0.85) < 0.05
+    assert executor.submitted % 4 == 0 and executor.run < executor.submitted  # stopped once the pooled sum converged
+    assert len(set([id(rng) for rng in executor.rngs])) == executor.submitted and deck.mc_rng not in executor.rngs
+    assert (Deck(mc_jobs=4, mc_rng=0, equity_cache=False, preflop_table=False).score_holdem(aces) == result).all()
+    submitted = executor.submitted
+    assert deck.score_holdem(aces, n_other_players=2, time_budget=50, return_info=True)[1]['n'] % 4 == 0
+    assert executor.submitted > submitted  # deadline runs use the pool too
+    executor = LazyExecutor()
+    players = [Player(ai=import_module('AI.DefaultTexasHoldemAI').TexasHoldemAI(name, 100, Player.names[:3], rng=0),
+                      name=name, cash=100) for name in Player.names[:3]]
+    Game(players, seed=0, verbose=False, deck_options={'mc_jobs': 2, 'mc_executor': executor}).run(n_hands=1)
+    assert executor.run and executor.submitted % 2 == 0
+    table_cards = (Card(2, 'Clubs'), Card(7, 'Diamonds'), Card('King', 'Clubs'), Card(9, 'Hearts'))
+    result, info = deck.score_holdem(aces, table_cards, other_deals=[kings], return_info=True)
+    assert info['method'] == 'exact' and info['n'] == 44 and np.allclose(result, [2 / 44, 42 / 44, 0])
+    assert deck.score_holdem(aces, table_cards, n_other_players=2, return_info=True)[1]['method'] == 'mc'
+    assert deck.score_holdem(aces, table_cards + (Card(4, 'Hearts'),), return_info=True)[1]['method'] == 'exact'
+    for these_table_cards in [(), table_cards[:3], table_cards]:  # nobody to beat
+        assert (deck.score_holdem(aces, these_table_cards, n_other_players=0) == [1, 0, 0]).all()
+        assert (deck.score_holdem(aces, these_table_cards, other_deals=[]) == [1, 0, 0]).all()
+
+
+def test_mc_processes():  # pooled batches pickle to other processes and pool in the same order as anywhere else
+    aces = (Card('Ace', 'Spades'), Card('Ace', 'Hearts'))
+    deals, table_cards = Deck(rng=2).deal_table(4, 3)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = []
+        for these in [executor, LazyExecutor()]:
+            deck = Deck(mc_jobs=2, mc_executor=these, mc_rng=0, equity_cache=False, preflop_table=False)
+            equity = TableEquity(deck, deals, n_other_players=3)
+            results.append([deck.score_holdem(aces, n_other_players=2), equity.score(table_cards)])
+            assert deck.score_holdem(aces, time_budget=20, return_info=True)[1]['n'] % 2 == 0
+    (result, (predicted, actual)), (other_result, (other_predicted, other_actual)) = results
+    assert (result == other_result).all() and abs(result[0] - 0.73) < 0.05
+    assert all([(predicted[i] == other_predicted[i]).all() and (actual[i] == other_actual[i]).all()
+                for i in range(len(deals))])
+
+
+def test_anytime_equity():
+    deck = Deck(equity_cache=False, preflop_table=False)
+    deal = (Card('Ace', 'Spades'), Card('King', 'Spades'))
+    result, info = deck.score_holdem(deal, n_other_players=5, target_stderr=0.01, return_info=True)
+    assert info['method'] == 'mc' and info['stderr'].max() <= 0.01 and (info['ci'][:, 0] <= result).all()
+    assert (result <= info['ci'][:, 1]).all()
+    result, info = deck.score_holdem(deal, n_other_players=5, target_stderr=0.0001, time_budget=20, return_info=True)
+    assert 100 <= info['n'] < 10 ** 6 and info['stderr'].max() > 0.0001  # the deadline, far short of the target
+    for target_stderr, time_budget in [(0, None), (0, 20), (-0.01, None), (0.0001, None)]:
+        try:
+            deck.score_holdem(deal, target_stderr=target_stderr, time_budget=time_budget)
+            assert False
+        except ValueError:
+            pass
+    table_cards = (Card(2, 'Clubs'), Card(7, 'Diamonds'), Card('King', 'Clubs'), Card(9, 'Hearts'), Card(4, 'Clubs'))
+    result, info = deck.score_holdem(deal, table_cards, time_budget=1, return_info=True)
+    assert info['method'] == 'exact' and not info['stderr'].any() and (info['ci'][:, 0] == result).all()
+
+
+def test_equity_session():
+    deck = Deck(rng=1, equity_cache=False, preflop_table=False)
+    deals, table_cards = deck.deal_table(1, 5)
+    deck.mask |= cards_to_mask(table_cards)
+    session = EquitySession(deck, deals[0], n_other_players=4)
+    for n_table_cards in [0, 3, 4, 5]:
+        deck.mask &= ~cards_to_mask(table_cards[:n_table_cards])
+        result, info = session.score(table_cards[:n_table_cards], return_info=True)
+        assert info['method'] == 'mc' and len(session.outcomes) == info['n']
+        assert info['reused'] > 0 or n_table_cards <= 3  # a whole flop is rarely among the pre-flop runouts
+        assert abs(result - deck.score_holdem(deals[0], table_cards[:n_table_cards], n_other_players=4)).max() < 0.05
+    assert session.score(table_cards) is result
+    assert session.score(table_cards[:3], return_info=True)[1]['reused'] == 0
+
+
+def test_table_equity():
+    deck = Deck(rng=2, equity_cache=False, preflop_table=False)
+    deals, table_cards = deck.deal_table(4, 4)
+    equity = TableEquity(deck, deals + [None], n_other_players=3)
+    predicted, actual = equity.score(table_cards)
+    assert predicted[4] is None and equity.methods[0, 'predicted'] == 'mc' and equity.methods[0, 'actual'] == 'exact'
+    for i, deal in enumerate(deals):
+        other_deals = [other_deal for other_deal in deals if other_deal is not deal]
+        assert np.allclose(actual[i], deck.score_holdem(deal, table_cards, other_deals=other_deals))
+        assert abs(predicted[i] - deck.score_holdem(deal, table_cards, n_other_players=3)).max() < 0.05
+    predicted, actual = equity.score(table_cards, live=[0, 1])
+    assert actual[2] is None and predicted[2] is None
+    assert np.allclose(actual[0], deck.score_holdem(deals[0], table_cards, other_deals=deals[1:2]))
+    progress = []
+    equity = TableEquity(deck, deals, n_other_players=3, progress=lambda *results: progress.append(results))
+    predicted, actual = equity.score(table_cards[:3])
+    assert len(progress) > 1 and all([len(results[0]) == 4 for results in progress])
+    assert np.allclose(progress[-1][0][0], predicted[0]) and np.allclose(progress[-1][1][1], actual[1])
+
+
+def test_range():
+    assert [len(Range(text)) for text in ['QQ+', 'AKs', 'AKo', 'AK', '22-55', 'A2s+', 'KTs-K7s', 'KsQs']] == \
+        [18, 4, 12, 16, 24, 48, 16, 1]
+    other_range = Range('QQ+, AKs, T9s:0.5')
+    assert len(other_range) == 26 and other_range.weights[(Card(9, 'Spades').id, Card(10, 'Spades').id)] == 0.5
+    for text in ['AKx', 'KA', 'AAs', 'AK:x', 'QQ-AKs']:
+        try:
+            Range(text)
+            assert False
+        except ValueError:
+            pass
+    deal = (Card('Ace', 'Spades'), Card('King', 'Hearts'))
+    table_cards = (Card(2, 'Clubs'), Card('Queen', 'Diamonds'), Card(7, 'Spades'), Card(9, 'Hearts'))
+    result, info = range_equity(deal, other_range, table_cards, return_info=True)
+    assert info['method'] == 'exact' and info['combos'] == (1, 22)
+    combos, weights = other_range.combos(cards_to_mask(deal + table_cards))
+    expected = sum([weight * Deck().score_holdem(deal, table_cards, other_deals=[tuple(map(Card.from_id, combo))])
+                    for combo, weight in zip(combos, weights)])
+    assert np.allclose(result, expected / expected.sum())
+    result = range_equity(Range('22+, A2+, K2+, Q2+, J2+, T2+, 92+, 82+, 72+, 62+, 52+, 42+, 32'), Range('AA'), rng=0)
+    assert abs(result[0] - 0.15) < 0.05 and abs(result.sum() - 1) < 1e-9
+
+
+def test_preflop_table():
+    table = PreflopTable.build(os.path.join(tempfile.mkdtemp(), 'preflop.npy'), n_samples=500, max_other_players=2)
+    assert table.counts.shape == (Deck.n_names ** 2, 2, 3) and (table.counts.sum(axis=2) == 500).all()
+    aces = (Card('Ace', 'Spades'), Card('Ace', 'Hearts'))
+    result, info = Deck(preflop_table=table).score_holdem(aces, return_info=True)
+    assert info['method'] == 'table' and abs(result[0] - 0.85) < 0.08
+    assert Deck(preflop_table=table).score_holdem(aces, n_other_players=3, return_info=True)[1]['method'] == 'mc'
+    assert PreflopTable.hand_class(aces) == PreflopTable.hand_class((Card('Ace', 'Clubs'), Card('Ace', 'Diamonds')))
+
+
+def test_equity_cache():
+    cache = EquityCache(maxsize=2)
+    deck = Deck(equity_cache=cache)
+    deal = (Card('Ace', 'Spades'), Card('King', 'Spades'))
+    table_cards = (Card(2, 'Spades'), Card(7, 'Spades'), Card(9, 'Hearts'))
+    result, info = deck.score_holdem(deal, table_cards, return_info=True)
+    assert not info['cached'] and cache.info() == {'hits': 0, 'misses': 1, 'size': 1, 'maxsize': 2}
+    same_deal = (Card('King', 'Hearts'), Card('Ace', 'Hearts'))
+    same_table_cards = (Card(9, 'Clubs'), Card(7, 'Hearts'), Card(2, 'Hearts'))
+    other_result, info = deck.score_holdem(same_deal, same_table_cards, return_info=True)
+    assert info['cached'] and (other_result == result).all() and cache.hits == 1
+    expected, expected_stderr = other_result.copy(), info['stderr'].copy()
+    other_result *= 0
+    info['stderr'] *= 0
+    result *= 0
+    other_result, info = Deck(equity_cache=cache).score_holdem(deal, table_cards, return_info=True)
+    assert info['cached'] and (other_result == expected).all() and (info['stderr'] == expected_stderr).all()
+    deck.score_holdem(deal, table_cards, n_other_players=2)
+    deck.score_holdem(deal, table_cards, n_other_players=3)
+    assert cache.info()['size'] == 2 and not deck.score_holdem(deal, table_cards, return_info=True)[1]['cached']
+    cache.enabled = False
+    assert not deck.score_holdem(deal, table_cards, n_other_players=3, return_info=True)[1]['cached']
+
+
 if __name__ == '__main__':
+    test_run()
+    test_history()
+    test_events()
+    test_tables()
+    test_tournament()
+    test_stats()
+    test_benchmark()
+    test_seed()
+    test_card()
     test_deck()
+    test_deal_table()
+    test_evaluator()
+    test_score_hands()
+    test_score_holdem()
+    test_mc_processes()
+    test_anytime_equity()
+    test_equity_session()
+    test_table_equity()
+    test_range()
+    test_preflop_table()
+    test_equity_cache()
     test_game()